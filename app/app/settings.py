@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Installed Apps
     'rest_framework',
@@ -45,7 +46,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Answers /healthz and /readyz itself, so keep it first.
+    'core.health.HealthCheckMiddleware',
+    'core.timing.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.db.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,14 +84,49 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # PostgreSQL with a per-process connection pool, see core.db.pool.
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'OPTIONS': {
+            # Seconds to wait for an unreachable server instead of hanging requests and probes.
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+            'MAX_IDLE': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            'HEALTH_CHECK_AFTER': float(os.environ.get('DB_POOL_HEALTH_CHECK_AFTER', 30)),
+        },
     }
 }
 
+# Shards holding users' recipes next to the primary, e.g. DB_SHARD_HOSTS=shard1,shard2.
+# Only ever append hosts: a shard's position fixes its id range. See core.db.sharding.
+for i, host in enumerate(filter(None, os.environ.get('DB_SHARD_HOSTS', '').split(',')), start=1):
+    DATABASES[f'shard_{i}'] = {**DATABASES['default'], 'HOST': host.strip()}
+
+USER_SHARDING = {
+    'SHARDS': [alias for alias in DATABASES if alias == 'default' or alias.startswith('shard_')],
+}
+
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1,replica2, each reached with
+# the primary's credentials. Needs the shared cache (REDIS_URL) for pinning
+# users to the primary after writes. See core.db.routers.
+for i, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    DATABASES[f'replica_{i}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['core.db.routers.ShardRouter', 'core.db.routers.ReplicaRouter']
+
+REPLICA_ROUTING = {
+    'REPLICAS': [alias for alias in DATABASES if alias.startswith('replica_')],
+    'PIN_SECONDS': int(os.environ.get('DB_REPLICA_PIN_SECONDS', 10)),
+    'CACHE_ALIAS': 'default',
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -132,11 +172,76 @@ MEDIA_URL = 'media/'
 STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media'
 
+# 'django' sends files from the app, 'x-accel-redirect' (nginx) or
+# 'x-sendfile' (apache/lighttpd) hand the transfer to the front server.
+MEDIA_SERVE_MODE = os.environ.get('MEDIA_SERVE_MODE', 'django')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
 AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'user.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+    # The fast JSON classes use orjson when installed and the stdlib otherwise.
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 100)),
+}
+
+# Shared by every process, e.g. REDIS_URL=redis://redis:6379/0. Without it
+# each process has its own LocMemCache, which other processes' writes cannot
+# invalidate, so the caches below keep entries only briefly.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+    }
+
+TOKEN_AUTH_CACHE = {
+    'LOCAL_MAXSIZE': 1024,
+    'LOCAL_TTL': 10,
+    'CACHE_ALIAS': 'default',
+    'CACHE_TTL': 300,
+}
+
+# Resized copies of uploaded recipe images, generated in a background pool.
+# Set RECIPE_IMAGE_WORKERS to 0 to generate them inline.
+RECIPE_IMAGE_RENDITIONS = {
+    'thumbnail': {'size': (150, 150), 'formats': ('webp', 'jpeg')},
+    'medium': {'size': (800, 800), 'formats': ('webp', 'jpeg')},
+}
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+
+RECIPE_LIST_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# Share of requests timed for Server-Timing headers and logs, off at 0. See core.timing.
+REQUEST_TIMING = {
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', 0)),
+}
+
+# Timed requests are logged at INFO on core.timing, one JSON line each.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
 }
@@ -15,12 +15,14 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from core.media import serve_media
 
 urlpatterns = [
-                  path('admin/', admin.site.urls),
-                  path('api/user/', include('user.urls')),
-                  path('api/recipe', include('recipe.urls')),
-              ] + static(settings.MEDIA_ROOT, document_root=settings.MEDIA_ROOT)
+    path('admin/', admin.site.urls),
+    path('api/user/', include('user.urls')),
+    path('api/recipe', include('recipe.urls')),
+    re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<path>.+)$', serve_media, name='media'),
+]
@@ -0,0 +1,46 @@
+"""
+Ad-hoc performance benchmarks.
+
+Run from the `app/` directory, e.g. `python -m benchmarks.assigned_only`.
+Every benchmark builds its data in a throwaway test database, so it is
+safe to point at the same settings as the running app.
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Create a test database for the duration of the block"""
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def timeit(func, repeat=5):
+    """Run `func` `repeat` times and return the timings in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def report(label, timings):
+    print(f'{label:<32} best {min(timings) * 1000:9.2f} ms   median {statistics.median(timings) * 1000:9.2f} ms')
@@ -0,0 +1,62 @@
+"""
+Compare the `assigned_only` tag filters on a large recipe/tag through table.
+
+    python -m benchmarks.assigned_only --recipes 100000 --tags-per-recipe 10
+"""
+import argparse
+
+from benchmarks import setup, test_database, timeit, report
+
+
+def populate(user, recipes, tags, tags_per_recipe, batch_size=10000):
+    from core.models import Recipe, Tag
+
+    tag_ids = [
+        tag.id for tag in Tag.objects.bulk_create([
+            Tag(user=user, name=f'Tag {i}') for i in range(tags)
+        ])
+    ]
+    # Leave a few tags unused so the filter has something to drop.
+    used_ids = tag_ids[:max(tags - 10, tags_per_recipe)]
+
+    through = Recipe.tags.through
+    for offset in range(0, recipes, batch_size):
+        created = Recipe.objects.bulk_create([
+            Recipe(user=user, title=f'Recipe {i}', time_minutes=10, price=5)
+            for i in range(offset, min(offset + batch_size, recipes))
+        ])
+        through.objects.bulk_create([
+            through(recipe_id=recipe.id, tag_id=used_ids[(recipe.id + k) % len(used_ids)])
+            for recipe in created
+            for k in range(tags_per_recipe)
+        ], batch_size=batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--tags', type=int, default=500)
+    parser.add_argument('--tags-per-recipe', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from core.models import Recipe, Tag
+
+    with test_database():
+        user = get_user_model().objects.create_user(email='bench@bench.com', password='bench')
+        populate(user, args.recipes, args.tags, args.tags_per_recipe)
+        print(f'through rows: {Recipe.tags.through.objects.count()}')
+
+        tags = Tag.objects.filter(user=user).order_by('-name')
+        join_distinct = tags.filter(recipe__isnull=False).distinct()
+        exists = tags.assigned()
+        assert list(join_distinct) == list(exists)
+
+        report('JOIN + DISTINCT', timeit(lambda: list(join_distinct.all()), args.repeat))
+        report('EXISTS semi-join', timeit(lambda: list(exists.all()), args.repeat))
+
+
+if __name__ == '__main__':
+    main()
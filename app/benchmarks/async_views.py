@@ -0,0 +1,118 @@
+"""
+Load test the async recipe list against the sync RecipeViewSet under ASGI.
+
+Requests are driven straight into Django's ASGI application from many
+concurrent clients, without a server in between, and the list response
+cache is disabled so every request reaches the database.
+
+    python -m benchmarks.async_views --rows 1000 --concurrency 100 --requests 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks import setup, test_database
+from benchmarks.list_serialization import populate
+
+
+async def asgi_get(application, path, query, headers):
+    """Send one GET through the ASGI application and return the status code"""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode('ascii'),
+        'query_string': query.encode('ascii'),
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), *headers],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    done = asyncio.Event()
+    sent = {}
+
+    async def receive():
+        if not sent:
+            sent['request'] = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            sent['status'] = message['status']
+        elif not message.get('more_body'):
+            done.set()
+
+    await application(scope, receive, send)
+
+    return sent['status']
+
+
+async def load(application, path, query, headers, concurrency, total):
+    """Return `(requests/sec, latencies)` for `total` requests from `concurrency` clients"""
+    latencies = []
+    remaining = iter(range(total))
+
+    async def client():
+        for _ in remaining:
+            start = time.perf_counter()
+            status = await asgi_get(application, path, query, headers)
+            latencies.append(time.perf_counter() - start)
+            assert status == 200, status
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    return total / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.core.asgi import get_asgi_application
+    from django.test.utils import override_settings
+    from django.urls import reverse
+    from rest_framework.authtoken.models import Token
+
+    caches = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'disabled': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    }
+    with test_database(), override_settings(
+        ALLOWED_HOSTS=['localhost'],
+        CACHES=caches,
+        RECIPE_LIST_CACHE={'CACHE_ALIAS': 'disabled'}
+    ):
+        user = get_user_model().objects.create_user(email='bench@bench.com', password='bench')
+        populate(user, args.rows)
+        token = Token.objects.create(user=user)
+
+        application = get_asgi_application()
+        headers = [(b'authorization', f'Token {token.key}'.encode('ascii'))]
+        query = f'page_size={args.page_size}'
+
+        print(f'{args.requests} requests, {args.concurrency} concurrent clients, {args.page_size} recipes per page')
+        for label, name in (('sync RecipeViewSet', 'recipe:recipe-list'), ('async view', 'recipe:async-recipe-list')):
+            path = reverse(name)
+            # Warm up connections, caches and lazily imported code.
+            asyncio.run(load(application, path, query, headers, 1, 10))
+            rate, latencies = asyncio.run(load(application, path, query, headers, args.concurrency, args.requests))
+            p50 = statistics.median(latencies) * 1000
+            p99 = statistics.quantiles(latencies, n=100)[98] * 1000
+            print(f'{label:<32} {rate:9.1f} req/s   p50 {p50:9.2f} ms   p99 {p99:9.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Compare DRF's JSONRenderer with the orjson-backed FastJSONRenderer on a
+recipe list payload.
+
+    python -m benchmarks.json_rendering --rows 10000
+"""
+import argparse
+from decimal import Decimal
+
+from benchmarks import setup, timeit, report
+
+
+def recipe_list(rows, decimals):
+    return {
+        'next': 'http://testserver/api/recipe/recipes/?cursor=eyJyIjowLCJwIjpbMTAwXX0',
+        'previous': None,
+        'results': [
+            {
+                'id': i,
+                'title': f'Recipe {i} crème brûlée',
+                'time_minutes': i % 120,
+                'price': Decimal(f'{i % 100}.99') if decimals else f'{i % 100}.99',
+                'link': None if i % 3 else f'https://example.com/{i}',
+                'ingredients': [i, i + 1, i + 2, i + 3, i + 4],
+                'tags': [i % 50, (i + 1) % 50],
+                'renditions': {'thumbnail': {'webp': f'http://testserver/media/uploads/recipe/renditions/{i}.webp'}},
+            }
+            for i in range(rows)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.renderers import JSONRenderer
+
+    from core import renderers
+    from core.renderers import FastJSONRenderer
+
+    if renderers.orjson is None:
+        print('orjson is not installed; FastJSONRenderer falls back to the stdlib encoder')
+
+    for label, decimals in (('str price', False), ('Decimal price', True)):
+        data = recipe_list(args.rows, decimals)
+        assert JSONRenderer().render(data) == FastJSONRenderer().render(data)
+        report(f'{label}: JSONRenderer', timeit(lambda: JSONRenderer().render(data), args.repeat))
+        report(f'{label}: FastJSONRenderer', timeit(lambda: FastJSONRenderer().render(data), args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare ModelSerializer output with the values() plan used by list endpoints.
+
+    python -m benchmarks.list_serialization --rows 10000
+"""
+import argparse
+
+from benchmarks import setup, test_database, timeit, report
+
+
+def populate(user, rows, batch_size=5000):
+    from core.models import Ingredient, Recipe, Tag
+
+    tags = Tag.objects.bulk_create([Tag(user=user, name=f'Tag {i}') for i in range(rows)])
+    ingredients = Ingredient.objects.bulk_create([Ingredient(user=user, name=f'Ingredient {i}') for i in range(50)])
+    recipes = Recipe.objects.bulk_create([
+        Recipe(user=user, title=f'Recipe {i}', time_minutes=i % 120, price=f'{i % 100}.99')
+        for i in range(rows)
+    ], batch_size=batch_size)
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tags[(i + k) % len(tags)].id)
+        for i, recipe in enumerate(recipes) for k in range(3)
+    ], batch_size=batch_size)
+    Recipe.ingredients.through.objects.bulk_create([
+        Recipe.ingredients.through(recipe_id=recipe.id, ingredient_id=ingredients[(i + k) % 50].id)
+        for i, recipe in enumerate(recipes) for k in range(5)
+    ], batch_size=batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.db.models import Prefetch
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from core.models import Ingredient, Recipe, Tag
+    from recipe.fast_serializers import ValuesPlan
+    from recipe.serializers import RecipeSerializer, TagSerializer
+
+    with test_database():
+        user = get_user_model().objects.create_user(email='bench@bench.com', password='bench')
+        populate(user, args.rows)
+        context = {'request': Request(APIRequestFactory().get('/'))}
+        renderer = JSONRenderer()
+
+        recipes = Recipe.objects.filter(user=user).order_by('id').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id').only('id')),
+            Prefetch('ingredients', queryset=Ingredient.objects.order_by('id').only('id')),
+        )
+        tags = Tag.objects.filter(user=user).order_by('-name', '-id')
+
+        for label, queryset, serializer_class in (('recipes', recipes, RecipeSerializer), ('tags', tags, TagSerializer)):
+            def regular():
+                return renderer.render(serializer_class(queryset.all(), many=True, context=context).data)
+
+            def fast():
+                plan = ValuesPlan(serializer_class(context=context))
+                rows = list(queryset.prefetch_related(None).values(*plan.columns))
+                return renderer.render(plan.render(rows))
+
+            assert regular() == fast()
+            report(f'{label}: ModelSerializer', timeit(regular, args.repeat))
+            report(f'{label}: values() plan', timeit(fast, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
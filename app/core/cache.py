@@ -0,0 +1,16 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared(alias):
+    """
+    Return whether every process sees the same cache under `alias`.
+
+    Invalidating an entry in a process-local cache only reaches the process
+    that did it, so anything relying on invalidation must not outlive a
+    short TTL there.
+    """
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
@@ -0,0 +1,19 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation as BaseDatabaseCreation
+
+from core.db.pool import PooledDatabaseWrapperMixin, close_pool
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections to the test database would block DROP DATABASE.
+        close_pool(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """PostgreSQL backend with connection pooling, see `PooledDatabaseWrapperMixin`"""
+    creation_class = DatabaseCreation
+
+    def is_connection_healthy(self, conn):
+        return not conn.closed and super().is_connection_healthy(conn)
@@ -0,0 +1,287 @@
+import functools
+import threading
+import time
+from collections import deque
+
+# Upper bounds (seconds) of the checkout wait-time histogram buckets.
+WAIT_BUCKETS = (0.001, 0.01, 0.1, 1.0)
+
+DEFAULTS = {
+    'MIN_SIZE': 0,
+    'MAX_SIZE': 10,
+    # Seconds to wait for a free connection before giving up.
+    'TIMEOUT': 5.0,
+    # Idle connections above MIN_SIZE are closed after this many seconds.
+    'MAX_IDLE': 300.0,
+    # Connections idle for longer than this are pinged before being handed out.
+    'HEALTH_CHECK_AFTER': 30.0,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out in time"""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    Connections are handed out most recently used first, so surplus ones
+    stay idle long enough to be reaped. Reaping happens on checkout and
+    release rather than in a background thread.
+    """
+
+    def __init__(self, connect, check=None, min_size=0, max_size=10, timeout=5.0, max_idle=300.0,
+                 health_check_after=30.0):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError('Pool sizes must satisfy 0 <= MIN_SIZE <= MAX_SIZE and MAX_SIZE >= 1.')
+
+        self._connect = connect
+        self._check = check
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._counters = {'acquired': 0, 'timeouts': 0, 'discarded': 0, 'reaped': 0}
+        self._wait_times = [0] * (len(WAIT_BUCKETS) + 1)
+
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def acquire(self):
+        """Check a connection out, waiting up to `timeout` seconds for one"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            conn, idle_since, reaped = self._reserve(deadline)
+            _close_all(reaped)
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except BaseException:
+                    self._forget()
+                    raise
+            elif time.monotonic() - idle_since > self.health_check_after and not self.is_healthy(conn):
+                self._discard(conn)
+                continue
+
+            self._record(time.monotonic() - start)
+            return conn
+
+    def release(self, conn, discard=False):
+        """Return a checked out connection, closing it instead if `discard`"""
+        if discard or self._closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            reaped = self._reap()
+            self._cond.notify()
+        _close_all(reaped)
+
+    def close(self):
+        """Close idle connections now and in-use ones when they are released"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        _close_all(idle)
+
+    def stats(self):
+        with self._cond:
+            wait_time = {f'le_{_duration(bound)}': count for bound, count in zip(WAIT_BUCKETS, self._wait_times)}
+            wait_time[f'gt_{_duration(WAIT_BUCKETS[-1])}'] = self._wait_times[-1]
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                **self._counters,
+                'wait_time': wait_time,
+            }
+
+    def _reserve(self, deadline):
+        """
+        Return `(connection, idle since, reaped)` for an idle connection, or
+        with a None connection once a slot to open a new one is reserved.
+        """
+        with self._cond:
+            self._waiting += 1
+            try:
+                reaped = self._reap()
+                while True:
+                    if self._closed:
+                        raise PoolTimeout('The connection pool is closed.')
+                    if self._idle:
+                        return (*self._idle.pop(), reaped)
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None, None, reaped
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        _close_all(reaped)
+                        raise PoolTimeout(
+                            f'No database connection available within {self.timeout}s '
+                            f'({self._size} in use, pool size {self.max_size}).'
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def _reap(self):
+        """Drop connections idle for longer than `max_idle` down to `min_size`; call with the lock held"""
+        expired = time.monotonic() - self.max_idle
+        reaped = []
+        while self._idle and self._size > self.min_size and self._idle[0][1] < expired:
+            reaped.append(self._idle.popleft()[0])
+            self._size -= 1
+        self._counters['reaped'] += len(reaped)
+
+        return reaped
+
+    def is_healthy(self, conn):
+        if self._check is None:
+            return True
+        try:
+            return self._check(conn)
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        self._forget()
+        with self._cond:
+            self._counters['discarded'] += 1
+        _close_all([conn])
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _record(self, waited):
+        with self._cond:
+            self._counters['acquired'] += 1
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self._wait_times[i] += 1
+                    break
+            else:
+                self._wait_times[-1] += 1
+
+
+def _duration(seconds):
+    return f'{seconds * 1000:g}ms' if seconds < 1 else f'{seconds:g}s'
+
+
+def _close_all(connections):
+    for conn in connections:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_pool_stats():
+    """Return the stats of every pool in this process, by database alias"""
+    with _pools_lock:
+        pools = {alias: pool for alias, (_, pool) in _pools.items()}
+
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+def close_pool(alias):
+    with _pools_lock:
+        _, pool = _pools.pop(alias, (None, None))
+    if pool is not None:
+        pool.close()
+
+
+def close_pools():
+    for alias in list(_pools):
+        close_pool(alias)
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Database wrapper mixin checking connections out of a per-process pool
+    configured by the database's `POOL` setting, instead of opening one per
+    request. Django's own close at the end of a request returns it to the
+    pool. Without `POOL` the backend behaves exactly like its base class.
+    """
+
+    def get_pool(self, conn_params):
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return None
+
+        key = repr(sorted(conn_params.items()))
+        with _pools_lock:
+            current_key, pool = _pools.get(self.alias, (None, None))
+            if current_key == key:
+                return pool
+            stale = pool
+
+            config = {**DEFAULTS, **options}
+            pool = ConnectionPool(
+                functools.partial(super().get_new_connection, conn_params),
+                check=self.is_connection_healthy,
+                **{name.lower(): value for name, value in config.items()}
+            )
+            _pools[self.alias] = (key, pool)
+
+        # The settings changed, e.g. to the test database; free the old connections.
+        if stale is not None:
+            stale.close()
+
+        return pool
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        if self.pool is None:
+            return super().get_new_connection(conn_params)
+
+        try:
+            return self.pool.acquire()
+        except PoolTimeout as e:
+            raise self.Database.OperationalError(str(e)) from e
+
+    def is_connection_healthy(self, conn):
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+
+        return True
+
+    def _close(self):
+        pool = getattr(self, 'pool', None)
+        if pool is None or self.connection is None:
+            return super()._close()
+
+        # Connections closed mid-transaction, or broken by an error, are not reused.
+        discard = self.in_atomic_block or (self.errors_occurred and not pool.is_healthy(self.connection))
+        if not discard and not self.get_autocommit():
+            try:
+                self.connection.rollback()
+            except self.Database.Error:
+                discard = True
+        pool.release(self.connection, discard=discard)
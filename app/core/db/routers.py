@@ -0,0 +1,223 @@
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import LazyObject, empty
+
+from core.cache import is_shared
+from core.db import sharding
+
+DEFAULTS = {
+    # Database aliases serving reads; empty sends everything to the primary.
+    'REPLICAS': [],
+    # Seconds a client keeps reading from the primary after a write.
+    'PIN_SECONDS': 10,
+    # Cache shared by every process, holding the pinned users. Must not be
+    # process-local, or a write would not pin reads served by other workers.
+    'CACHE_ALIAS': 'default',
+    # Models always read from the primary. A token is used right after the
+    # login that created it, before that client could be pinned.
+    'PRIMARY_MODELS': ['authtoken.token'],
+}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_routing = contextvars.ContextVar('replica_routing', default=None)
+
+
+def _setting(name):
+    return getattr(settings, 'REPLICA_ROUTING', {}).get(name, DEFAULTS[name])
+
+
+class _Routing:
+    """Routing state of one request"""
+
+    def __init__(self, request):
+        self.request = request
+        self.primary = request.method not in SAFE_METHODS
+        self.wrote = False
+        self.pinned = None
+        self.replica = random.choice(_setting('REPLICAS'))
+
+    def use_primary(self):
+        if self.primary or self.wrote:
+            return True
+
+        if self.pinned is None:
+            user = _authenticated_user(self.request)
+            if user is None:
+                # Authentication itself reads from the primary: whose reads these are is not known yet.
+                return True
+            self.pinned = user.is_authenticated and caches[_setting('CACHE_ALIAS')].get(_pin_key(user.pk)) is not None
+
+        return self.pinned
+
+
+def _authenticated_user(request):
+    """Return the request's user once authentication ran, without running it"""
+    user = getattr(request, 'user', None)
+    if isinstance(user, LazyObject):
+        # Set by AuthenticationMiddleware, and resolved on first use.
+        return None if user._wrapped is empty else user._wrapped
+
+    return user
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def _written_by(routing):
+    """Return the key pinning the user who wrote in this request, if any"""
+    if not routing.wrote:
+        return None
+
+    user = _authenticated_user(routing.request)
+    if user is None or not user.is_authenticated:
+        return None
+
+    return _pin_key(user.pk)
+
+
+def _instance_shard(instance):
+    if instance is None:
+        return None
+    if instance._meta.label == settings.AUTH_USER_MODEL:
+        return instance.shard
+    if instance._state.db is not None:
+        return instance._state.db
+
+    # New rows follow their user, when it was assigned as an object.
+    user = instance._state.fields_cache.get('user')
+    return getattr(user, 'shard', None)
+
+
+class ShardRouter:
+    """
+    Send queries on users' tags, ingredients and recipes to the user's shard:
+    the one activated for the current request, or else the one of the
+    instance at hand. The primary is left to the next router, so its reads
+    may still go to a replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not sharding.is_sharded(model):
+            return None
+
+        alias = sharding.get_current_shard() or _instance_shard(hints.get('instance'))
+        if alias == DEFAULT_DB_ALIAS:
+            return None
+
+        return alias
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        shards = sharding.get_shards()
+        if obj1._state.db not in shards or obj2._state.db not in shards:
+            return None
+
+        # Users are copied to the shard holding their data.
+        if obj1._state.db == obj2._state.db or settings.AUTH_USER_MODEL in (obj1._meta.label, obj2._meta.label):
+            return True
+
+        return None
+
+
+class ReplicaRouter:
+    """
+    Send reads made while serving a safe request to a replica, and every
+    write, as well as reads in unsafe requests, transactions or outside of a
+    request, to the primary.
+
+    After a write the user is pinned to the primary for `PIN_SECONDS`, on
+    any device and credentials, so they read their own writes despite
+    replication lag. Reads made before the request is authenticated go to
+    the primary. Requires `ReplicaRoutingMiddleware`.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or routing.use_primary():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block or model._meta.label_lower in _setting('PRIMARY_MODELS'):
+            return DEFAULT_DB_ALIAS
+
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *_setting('REPLICAS')}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        if db in _setting('REPLICAS'):
+            return False
+
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Track each request's routing state for `ReplicaRouter` and pin users that write"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if _setting('REPLICAS') and not is_shared(_setting('CACHE_ALIAS')):
+            raise ImproperlyConfigured(
+                f'Replica routing needs a cache shared by every process, '
+                f'{_setting("CACHE_ALIAS")!r} is process-local. Set REDIS_URL.'
+            )
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _setting('REPLICAS'):
+            return self.get_response(request)
+
+        routing = _Routing(request)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        pin_key = _written_by(routing)
+        if pin_key is not None:
+            caches[_setting('CACHE_ALIAS')].set(pin_key, True, _setting('PIN_SECONDS'))
+
+        return response
+
+    async def __acall__(self, request):
+        if not _setting('REPLICAS'):
+            return await self.get_response(request)
+
+        routing = _Routing(request)
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        pin_key = _written_by(routing)
+        if pin_key is not None:
+            await caches[_setting('CACHE_ALIAS')].aset(pin_key, True, _setting('PIN_SECONDS'))
+
+        return response
@@ -0,0 +1,188 @@
+"""
+User-keyed sharding of recipe data.
+
+Every user's tags, ingredients and recipes, with their many-to-many rows,
+live on one database alias, the user's shard, recorded in `User.shard`.
+Users themselves stay on the primary, with a copy on the shard holding
+their data for its foreign keys. New users are placed on the shard with the
+fewest users, `ShardRouter` sends queries to the shard activated for the
+request, see `recipe.sharding.ShardedViewMixin`, and `move_users` moves
+users between shards.
+"""
+import contextlib
+import contextvars
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count
+
+DEFAULTS = {
+    # Databases holding user data, the primary first. Only ever append: the
+    # position of a shard fixes the range its ids are drawn from.
+    'SHARDS': [DEFAULT_DB_ALIAS],
+    # Ids on the n-th shard start at n * ID_RANGE + 1, so rows keep their id
+    # when their user moves to another shard.
+    'ID_RANGE': 2 ** 40,
+    # Shards new users are placed on, the one with the fewest users first.
+    # None for every shard.
+    'NEW_USER_SHARDS': None,
+}
+
+# Models owned by a user and stored on the user's shard, with their
+# many-to-many tables. Parents come first.
+SHARDED_MODELS = ('core.tag', 'core.ingredient', 'core.recipe')
+
+_current = contextvars.ContextVar('shard', default=None)
+
+
+def _setting(name):
+    return getattr(settings, 'USER_SHARDING', {}).get(name, DEFAULTS[name])
+
+
+def get_shards():
+    return _setting('SHARDS')
+
+
+def get_sharded_models():
+    return [apps.get_model(label) for label in SHARDED_MODELS]
+
+
+def is_sharded(model):
+    """Return whether rows of `model` live on their user's shard"""
+    opts = model._meta
+    if opts.auto_created:
+        opts = opts.auto_created._meta
+
+    return opts.label_lower in SHARDED_MODELS
+
+
+def _user_shard_query(user_id):
+    return get_user_model().objects.using(DEFAULT_DB_ALIAS).values_list('shard', 'shard_moving').filter(pk=user_id)
+
+
+def get_user_shard(user_id):
+    """
+    Return a user's `(shard, moving)`, read from the primary. Cached users,
+    e.g. the token cache's, may not have seen a move yet. Without a second
+    shard nobody moves, and no query is made.
+    """
+    if get_shards() == [DEFAULT_DB_ALIAS]:
+        return DEFAULT_DB_ALIAS, False
+
+    return _user_shard_query(user_id).get()
+
+
+async def aget_user_shard(user_id):
+    if get_shards() == [DEFAULT_DB_ALIAS]:
+        return DEFAULT_DB_ALIAS, False
+
+    return await _user_shard_query(user_id).aget()
+
+
+def place_new_user():
+    """Return the shard a new user is created on, read from the primary"""
+    shards = _setting('NEW_USER_SHARDS') or get_shards()
+    if len(shards) == 1:
+        return shards[0]
+
+    counts = dict(
+        get_user_model().objects.using(DEFAULT_DB_ALIAS)
+        .filter(shard__in=shards).values_list('shard').annotate(Count('pk')).order_by()
+    )
+
+    return min(shards, key=lambda alias: counts.get(alias, 0))
+
+
+def copy_user(user, alias):
+    """Copy `user` to shard `alias`, where the foreign keys of their rows point to it"""
+    fields = {field.attname: getattr(user, field.attname) for field in user._meta.concrete_fields}
+    type(user).objects.using(alias).bulk_create([type(user)(**fields)])
+
+
+def get_current_shard():
+    """Return the shard activated for the current request, if any"""
+    return _current.get()
+
+
+def activate(alias):
+    """Route sharded models to `alias` until `deactivate` is called with the returned token"""
+    return _current.set(alias)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextlib.contextmanager
+def use_shard(alias):
+    token = activate(alias)
+    try:
+        yield
+    finally:
+        deactivate(token)
+
+
+def iterate_on_shard(alias, iterable):
+    """Iterate with `alias` active, e.g. a streamed response body consumed after the view returned"""
+    iterator = iter(iterable)
+    while True:
+        # Only around each step: the consumer may switch contexts in between.
+        with use_shard(alias):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def get_id_range(alias):
+    """Return the first and last id drawn on shard `alias`"""
+    size = _setting('ID_RANGE')
+    index = get_shards().index(alias)
+
+    return index * size + 1, (index + 1) * size
+
+
+def reset_id_sequences(alias):
+    """
+    Make the id sequences of sharded models on `alias` continue after the
+    highest id of the shard's own range, ignoring rows moved in from others.
+    """
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    first, last = get_id_range(alias)
+
+    with connection.cursor() as cursor:
+        for model in get_sharded_models():
+            table, column = model._meta.db_table, model._meta.pk.column
+            cursor.execute(
+                f'SELECT MAX({quote(column)}) FROM {quote(table)} WHERE {quote(column)} BETWEEN %s AND %s',
+                [first, last]
+            )
+            highest = cursor.fetchone()[0] or first - 1
+
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_sequence_last_value(pg_get_serial_sequence(%s, %s))', [table, column])
+            else:
+                cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+            current = (cursor.fetchone() or [None])[0]
+            if current is not None and first <= current <= last:
+                highest = max(highest, current)
+
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT setval(pg_get_serial_sequence(%s, %s), %s, false)', [table, column, highest + 1])
+            else:
+                # SQLite always continues after the highest id in the table, so
+                # rows moved in from a later shard take it into that one's range.
+                # Fine for development, use PostgreSQL for sharding otherwise.
+                cursor.execute('DELETE FROM sqlite_sequence WHERE name = %s', [table])
+                cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, highest])
+
+
+def reserve_id_range(using=DEFAULT_DB_ALIAS, **kwargs):
+    """`post_migrate` receiver starting a shard's sequences in its id range"""
+    shards = get_shards()
+    if len(shards) > 1 and using in shards:
+        reset_id_sequences(using)
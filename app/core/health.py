@@ -0,0 +1,99 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.utils import DatabaseError
+from django.http import JsonResponse
+
+from core.db.pool import get_pool_stats
+
+DEFAULTS = {
+    'LIVENESS_PATH': '/healthz',
+    'READINESS_PATH': '/readyz',
+    # Seconds a readiness round trip may take on each database before it
+    # counts as down. Connecting is bounded by the database's connect_timeout.
+    'DATABASE_TIMEOUT': 2,
+}
+
+
+def _setting(name):
+    return getattr(settings, 'HEALTH_CHECKS', {}).get(name, DEFAULTS[name])
+
+
+def check_databases():
+    """Return `{alias: {'ok', 'latency_ms'[, 'error']}}` from a round trip to every database"""
+    results = {}
+    for alias in connections:
+        start = time.perf_counter()
+        try:
+            _round_trip(connections[alias])
+        except DatabaseError as e:
+            # Only the error type: probes are not authenticated.
+            results[alias] = {'ok': False, 'error': type(e).__name__}
+            continue
+        results[alias] = {'ok': True, 'latency_ms': round((time.perf_counter() - start) * 1000, 3)}
+
+    return results
+
+
+def _round_trip(connection):
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # A database accepting connections but stuck on queries must not hang the probe.
+            timeout_ms = int(_setting('DATABASE_TIMEOUT') * 1000)
+            cursor.execute("SELECT set_config('statement_timeout', %s, true)", [str(timeout_ms)])
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def pool_saturation():
+    """Return each connection pool's stats, with the share of connections in use"""
+    return {
+        alias: {**stats, 'saturation': round(stats['in_use'] / stats['max_size'], 3)}
+        for alias, stats in get_pool_stats().items()
+    }
+
+
+class HealthCheckMiddleware:
+    """
+    Answer liveness and readiness probes before any other middleware, so
+    load balancers skip host validation, sessions, authentication and the
+    URL resolver. Must come first in MIDDLEWARE.
+
+    Liveness only shows the process serves requests. Readiness also makes a
+    round trip to every database and fails with 503 if one is down.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path == _setting('LIVENESS_PATH'):
+            return JsonResponse({'status': 'ok'})
+        if request.path == _setting('READINESS_PATH'):
+            return self.readiness()
+
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path == _setting('LIVENESS_PATH'):
+            return JsonResponse({'status': 'ok'})
+        if request.path == _setting('READINESS_PATH'):
+            # Database drivers block: probe in the thread the ORM uses.
+            return await sync_to_async(self.readiness)()
+
+        return await self.get_response(request)
+
+    def readiness(self):
+        databases = check_databases()
+        ready = all(result['ok'] for result in databases.values())
+        data = {'status': 'ok' if ready else 'unavailable', 'databases': databases, 'pools': pool_saturation()}
+
+        return JsonResponse(data, status=200 if ready else 503)
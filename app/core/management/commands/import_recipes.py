@@ -0,0 +1,300 @@
+import csv
+import io
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.cache import bump_user_version
+
+RECIPE_FIELDS = ('title', 'time_minutes', 'price', 'link')
+RELATIONS = (('tags', Tag), ('ingredients', Ingredient))
+LIST_SEPARATOR = ';'
+
+
+class Command(BaseCommand):
+    """ Django command to bulk import recipes from an NDJSON or CSV file """
+    help = (
+        'Import recipes with their tags and ingredients from NDJSON or CSV. Each row holds '
+        f'{", ".join(RECIPE_FIELDS)}, tags and ingredients (names, as a list or separated by '
+        f'"{LIST_SEPARATOR}") and optionally the owner\'s email as user.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('ndjson', 'csv'), help='Defaults to the file extension')
+        parser.add_argument('--user', help='Email of the owner of rows without a user')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--checkpoint',
+            help=(
+                'File recording the rows already imported; an interrupted import resumes from it. '
+                'Rows of the batch in flight may be imported twice.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        if connection.vendor != 'postgresql' and not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError(f'Bulk import is not supported on {connection.vendor}.')
+
+        self.default_user = options['user']
+        self.user_ids = {}
+        self.user_shards = {}
+        self.names = {Tag: {}, Ingredient: {}}
+        self.loaded_users = {Tag: set(), Ingredient: set()}
+        self.skipped = 0
+
+        checkpoint = options['checkpoint']
+        done = self._read_checkpoint(checkpoint, path)
+        if done:
+            self.stdout.write(f'Resuming after {done} rows.')
+
+        imported = 0
+        started = time.monotonic()
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = self._read(f, fmt, done)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+
+                imported += self._load(batch)
+                done += len(batch)
+                if checkpoint:
+                    self._write_checkpoint(checkpoint, path, done)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'{done} rows read, {imported} imported ({imported / elapsed:,.0f} rows/sec)')
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} recipes, skipped {self.skipped} rows.'))
+
+    def _read(self, f, fmt, skip):
+        """Yield `(row number, row)` from the input, skipping rows already imported"""
+        if fmt == 'csv':
+            return enumerate(islice(csv.DictReader(f), skip, None), start=skip + 1)
+
+        lines = (line for line in f if line.strip())
+        return ((number, _parse_json(line)) for number, line in enumerate(islice(lines, skip, None), start=skip + 1))
+
+    def _load(self, batch):
+        """Insert one batch of rows, returning the number of recipes created"""
+        self._resolve_users({row.get('user') or self.default_user for _, row in batch if isinstance(row, dict)})
+
+        recipes = []
+        for number, row in batch:
+            try:
+                recipes.append(self._clean(row))
+            except (ValidationError, ValueError, TypeError) as e:
+                self.skipped += 1
+                self.stderr.write(f'Skipping row {number}: {e}')
+
+        by_shard = defaultdict(list)
+        for recipe in recipes:
+            by_shard[self.user_shards[recipe[0]]].append(recipe)
+
+        # One transaction per shard, committed one after another: a failure
+        # after the first commit keeps that shard's rows. The checkpoint is
+        # only written once every shard committed, so resuming loads them
+        # again; imports are at-least-once per batch.
+        with ExitStack() as stack:
+            for alias in by_shard:
+                stack.enter_context(transaction.atomic(using=alias))
+            for alias, shard_recipes in by_shard.items():
+                self._load_shard(connections[alias], shard_recipes)
+
+        # Neither COPY nor bulk_create send signals, so invalidate cached lists here.
+        for user_id in {user_id for user_id, _, _ in recipes}:
+            bump_user_version(user_id)
+
+        return len(recipes)
+
+    def _load_shard(self, connection, recipes):
+        """Insert the recipes of users on one shard"""
+        for relation, model in RELATIONS:
+            self._resolve_names(model, relation, recipes, connection.alias)
+
+        if connection.vendor == 'postgresql':
+            recipe_ids = self._copy_recipes(connection, recipes)
+        else:
+            created = Recipe.objects.using(connection.alias).bulk_create(
+                [Recipe(user_id=user_id, **fields) for user_id, fields, _ in recipes]
+            )
+            recipe_ids = [recipe.pk for recipe in created]
+
+        for relation, model in RELATIONS:
+            field = Recipe._meta.get_field(relation)
+            names = self.names[model]
+            links = [
+                (recipe_id, names[user_id, name])
+                for recipe_id, (user_id, _, related) in zip(recipe_ids, recipes)
+                for name in related[relation]
+            ]
+            self._insert_links(connection, field, links)
+
+    def _resolve_users(self, emails):
+        missing = {email for email in emails if email and email not in self.user_ids}
+        if missing:
+            found = get_user_model().objects.filter(email__in=missing)
+            self.user_ids.update({email: None for email in missing})
+            for email, user_id, shard, moving in found.values_list('email', 'id', 'shard', 'shard_moving'):
+                # Moving users' rows would be left behind on their old shard.
+                self.user_ids[email] = None if moving else user_id
+                self.user_shards[user_id] = shard
+
+    def _clean(self, row):
+        """Return `(user id, recipe fields, {relation: names})` for a valid row"""
+        if isinstance(row, ValueError):
+            raise row
+        if not isinstance(row, dict):
+            raise ValueError('Expected an object.')
+
+        email = row.get('user') or self.default_user
+        user_id = self.user_ids.get(email)
+        if user_id is None:
+            raise ValueError(f'Unknown or moving user {email!r}.')
+
+        fields = {}
+        for name in RECIPE_FIELDS:
+            value = row.get(name)
+            field = Recipe._meta.get_field(name)
+            if value in (None, '') and field.null:
+                fields[name] = None
+                continue
+            fields[name] = field.clean(value, None)
+
+        related = {}
+        for relation, model in RELATIONS:
+            name_field = model._meta.get_field('name')
+            related[relation] = [name_field.clean(name, None) for name in _names(row.get(relation))]
+
+        return user_id, fields, related
+
+    def _resolve_names(self, model, relation, recipes, using):
+        """Map every `(user id, name)` of the batch to an id, creating missing objects"""
+        names = self.names[model]
+        loaded = self.loaded_users[model]
+        objects = model.objects.using(using)
+
+        new_users = {user_id for user_id, _, _ in recipes} - loaded
+        if new_users:
+            for user_id, name, pk in objects.filter(user_id__in=new_users).values_list('user_id', 'name', 'id'):
+                names[user_id, name] = pk
+            loaded.update(new_users)
+
+        missing = {
+            (user_id, name)
+            for user_id, _, related in recipes
+            for name in related[relation]
+            if (user_id, name) not in names
+        }
+        if not missing:
+            return
+
+        objects.bulk_create(
+            [model(user_id=user_id, name=name) for user_id, name in missing],
+            ignore_conflicts=True
+        )
+        users = {user_id for user_id, _ in missing}
+        created = objects.filter(user_id__in=users, name__in={name for _, name in missing})
+        for user_id, name, pk in created.values_list('user_id', 'name', 'id'):
+            names[user_id, name] = pk
+
+    def _copy_recipes(self, connection, recipes):
+        """Load recipes with COPY, using ids reserved from the table's sequence"""
+        meta = Recipe._meta
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [meta.db_table, meta.pk.column, len(recipes)]
+            )
+            recipe_ids = [pk for pk, in cursor.fetchall()]
+
+            now = timezone.now()
+            columns = ['id', 'user', *RECIPE_FIELDS, 'image', 'image_renditions', 'updated_at']
+            rows = (
+                [recipe_id, user_id, *(fields[name] for name in RECIPE_FIELDS), '', '{}', now]
+                for recipe_id, (user_id, fields, _) in zip(recipe_ids, recipes)
+            )
+            _copy(cursor, meta.db_table, [meta.get_field(name).column for name in columns], rows)
+
+        return recipe_ids
+
+    def _insert_links(self, connection, field, links):
+        table = field.remote_field.through._meta.db_table
+        columns = [field.m2m_column_name(), field.m2m_reverse_name()]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                _copy(cursor, table, columns, links)
+            else:
+                # Through rows are plain id pairs; skip building model instances for them.
+                quote = connection.ops.quote_name
+                cursor.executemany(
+                    f'INSERT INTO {quote(table)} ({", ".join(map(quote, columns))}) VALUES (%s, %s)',
+                    links
+                )
+
+    def _read_checkpoint(self, checkpoint, path):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+
+        with open(checkpoint) as f:
+            state = json.load(f)
+        if state['source'] != os.path.abspath(path):
+            raise CommandError(f'Checkpoint {checkpoint} belongs to {state["source"]}.')
+
+        return state['rows']
+
+    def _write_checkpoint(self, checkpoint, path, rows):
+        # Replace the file atomically so an interrupted write never loses progress.
+        partial = f'{checkpoint}.partial'
+        with open(partial, 'w') as f:
+            json.dump({'source': os.path.abspath(path), 'rows': rows}, f)
+        os.replace(partial, checkpoint)
+
+
+def _parse_json(line):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+
+def _names(value):
+    """Return the distinct names of a list or separated string, in order"""
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        value = value.split(LIST_SEPARATOR)
+    elif not isinstance(value, list):
+        raise ValueError(f'Expected a list of names, got {value!r}.')
+
+    return list(dict.fromkeys(name.strip() for name in map(str, value) if name.strip()))
+
+
+def _copy(cursor, table, columns, rows):
+    """Stream rows into `table` with COPY ... FROM STDIN in csv format"""
+    buffer = io.StringIO()
+    # Quoting every string keeps empty strings apart from NULLs (unquoted empties).
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    writer.writerows(rows)
+    buffer.seek(0)
+
+    quote = cursor.db.ops.quote_name
+    cursor.copy_expert(
+        f'COPY {quote(table)} ({", ".join(map(quote, columns))}) FROM STDIN WITH (FORMAT csv)',
+        buffer
+    )
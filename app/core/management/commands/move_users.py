@@ -0,0 +1,166 @@
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count
+
+from core.db.sharding import copy_user, get_sharded_models, get_shards, reset_id_sequences
+from core.models import Recipe
+from recipe.cache import bump_user_version
+
+# Seconds for requests that read a user's shard before it changed to finish.
+DRAIN_SECONDS = 15
+
+
+class Command(BaseCommand):
+    """ Django command to move users and their recipes between shards """
+    help = (
+        'Move users with their tags, ingredients and recipes to another shard, or rebalance the shards. '
+        'Moving users can read their data throughout, writes are refused until the move completes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('emails', nargs='*', metavar='email')
+        parser.add_argument('--to', dest='target', help='Shard to move the given users to')
+        parser.add_argument(
+            '--rebalance',
+            action='store_true',
+            help='Move users until the shards hold a similar number of recipes'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only print the moves')
+        parser.add_argument(
+            '--drain-seconds',
+            type=float,
+            default=DRAIN_SECONDS,
+            help=f'Wait for requests that started before a state change to finish (default {DRAIN_SECONDS})'
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        shards = get_shards()
+        if options['rebalance'] == bool(options['emails'] or options['target']):
+            raise CommandError('Pass either email addresses with --to, or --rebalance.')
+
+        self.batch_size = options['batch_size']
+        self.drain_seconds = options['drain_seconds']
+
+        if options['rebalance']:
+            moves = self._plan_rebalance(shards)
+        else:
+            if options['target'] not in shards:
+                raise CommandError(f'Unknown shard {options["target"]!r}, expected one of: {", ".join(shards)}.')
+            users = list(get_user_model().objects.filter(email__in=options['emails']))
+            unknown = set(options['emails']) - {user.email for user in users}
+            if unknown:
+                raise CommandError(f'Unknown users: {", ".join(sorted(unknown))}.')
+            moves = [(user, options['target']) for user in users]
+
+        for user, target in moves:
+            if user.shard == target:
+                self.stdout.write(f'{user.email} is already on {target}.')
+                continue
+
+            self.stdout.write(f'Moving {user.email} from {user.shard} to {target}')
+            if not options['dry_run']:
+                self._move(user, target)
+
+        self.stdout.write(self.style.SUCCESS(f'{len(moves)} users {"to move" if options["dry_run"] else "moved"}.'))
+
+    def _plan_rebalance(self, shards):
+        """Return `(user, shard)` moves evening out the number of recipes per shard"""
+        sizes = {}
+        for alias in shards:
+            counts = Recipe.objects.using(alias).values('user_id').annotate(count=Count('id'))
+            sizes[alias] = {row['user_id']: row['count'] for row in counts}
+        load = {alias: sum(users.values()) for alias, users in sizes.items()}
+
+        moves = {}
+        while True:
+            source = max(load, key=load.get)
+            target = min(load, key=load.get)
+            gap = load[source] - load[target]
+            # Moving fewer recipes than the gap narrows it, most when moving half.
+            candidates = [(abs(gap / 2 - count), user_id) for user_id, count in sizes[source].items() if count < gap]
+            if not candidates:
+                break
+
+            user_id = min(candidates)[1]
+            count = sizes[source].pop(user_id)
+            load[source] -= count
+            load[target] += count
+            moves[user_id] = target
+
+        users = get_user_model().objects.in_bulk(moves)
+        return [(users[user_id], target) for user_id, target in moves.items()]
+
+    def _move(self, user, target):
+        source = user.shard
+
+        # Refuse writes, then wait for requests that started before.
+        self._set_state(user, shard_moving=True)
+        try:
+            self._drain()
+            with transaction.atomic(using=target):
+                self._delete(user, target)
+                copied = self._copy(user, source, target)
+                reset_id_sequences(target)
+        except BaseException:
+            self._set_state(user, shard_moving=False)
+            raise
+        self._set_state(user, shard=target, shard_moving=False)
+        bump_user_version(user.pk)
+        self.stdout.write(f'  copied {copied} rows, now on {target}')
+
+        # Requests may keep reading from the old shard until they see the switch.
+        self._drain()
+        with transaction.atomic(using=source):
+            self._delete(user, source)
+
+    def _set_state(self, user, **fields):
+        for name, value in fields.items():
+            setattr(user, name, value)
+        # Requests route on these fields read from the primary, never on a cached user.
+        user.save(using=DEFAULT_DB_ALIAS, update_fields=list(fields))
+
+    def _drain(self):
+        time.sleep(self.drain_seconds)
+
+    def _copy(self, user, source, target):
+        """Copy the user's rows from `source` to `target`, keeping their ids, and return their number"""
+        copied = 0
+        if target != DEFAULT_DB_ALIAS:
+            copy_user(user, target)
+
+        for model in get_sharded_models():
+            rows = model.objects.using(source).filter(user_id=user.pk).order_by('pk')
+            copied += self._bulk_create(model, target, rows.iterator(chunk_size=self.batch_size))
+
+        for field in Recipe._meta.many_to_many:
+            through = field.remote_field.through
+            columns = (f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id')
+            links = through.objects.using(source).filter(**{f'{field.m2m_field_name()}__user_id': user.pk})
+            rows = (through(**dict(zip(columns, link))) for link in links.values_list(*columns).iterator())
+            copied += self._bulk_create(through, target, rows)
+
+        return copied
+
+    def _bulk_create(self, model, using, rows):
+        created = 0
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return created
+            model.objects.using(using).bulk_create(batch)
+            created += len(batch)
+
+    def _delete(self, user, alias):
+        """Delete the user's rows on `alias`, where they are left over from a move"""
+        if alias != DEFAULT_DB_ALIAS:
+            # Deleting the copy of the user cascades to their rows.
+            type(user).objects.using(alias).filter(pk=user.pk).delete()
+            return
+
+        for model in reversed(get_sharded_models()):
+            model.objects.using(alias).filter(user_id=user.pk).delete()
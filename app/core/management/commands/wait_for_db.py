@@ -1,21 +1,48 @@
 import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import connections
 from django.db.utils import OperationalError
 
+# Delay before the first retry, doubled after every failure up to MAX_DELAY.
+INITIAL_DELAY = 0.1
+MAX_DELAY = 5
+
 
 class Command(BaseCommand):
     """ Django command to pause execution until database is available """
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            action='append',
+            dest='databases',
+            help='Database alias to wait for, may be repeated; defaults to every configured database'
+        )
+        parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait before giving up')
+
     def handle(self, *args, **options):
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
-            try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable, wait for 1 second...')
-                time.sleep(1)
+        deadline = time.monotonic() + options['timeout']
+        for alias in options['databases'] or list(connections):
+            self._wait(alias, deadline)
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
+
+    def _wait(self, alias, deadline):
+        delay = INITIAL_DELAY
+        while True:
+            try:
+                # Looking up the connection never fails, so run a query.
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                return
+            except OperationalError as e:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(f'Database {alias} unavailable: {e}')
+
+                delay = min(delay, remaining)
+                self.stdout.write(f'Database {alias} unavailable, waiting {delay:.1f} seconds...')
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_DELAY)
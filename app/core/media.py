@@ -0,0 +1,137 @@
+import hashlib
+import mimetypes
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+
+# Files named by `recipe_image_file_path` (and their renditions) never change
+# content under the same name, so they can be cached forever.
+IMMUTABLE_PATH = re.compile(r'^uploads/recipe/(renditions/)?[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600'
+
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=4096)
+def _content_etag(path, mtime_ns, size):
+    """Hash a file's content; keyed on mtime and size so edits miss the cache"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _parse_range(header, size):
+    """
+    Return `(start, end)` for a single satisfiable byte range, None to send
+    the whole file, or raise ValueError if the range cannot be satisfied.
+    """
+    match = RANGE_HEADER.match(header or '')
+    if not match:
+        # Missing, malformed or multi-range requests get the full body.
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+
+    if start >= size or start > end:
+        raise ValueError('Unsatisfiable range')
+
+    return start, end
+
+
+def _read_range(f, start, length):
+    with f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve an uploaded file.
+
+    With `MEDIA_SERVE_MODE` set to 'x-accel-redirect' or 'x-sendfile' the
+    transfer is handed to the front web server; otherwise the file is sent
+    from Django with content-hash ETags and byte-range support.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    cache_control = IMMUTABLE_CACHE_CONTROL if IMMUTABLE_PATH.match(path) else DEFAULT_CACHE_CONTROL
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    mode = settings.MEDIA_SERVE_MODE
+    if mode in ('x-accel-redirect', 'x-sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if mode == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + path
+        else:
+            response['X-Sendfile'] = full_path
+        response['Cache-Control'] = cache_control
+        return response
+
+    etag = _content_etag(full_path, stat.st_mtime_ns, stat.st_size)
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+        response = HttpResponseNotModified()
+    else:
+        try:
+            byte_range = _parse_range(request.headers.get('Range'), stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+        if request.headers.get('If-Range') not in (None, etag):
+            byte_range = None
+
+        if byte_range is None:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _read_range(open(full_path, 'rb'), start, length),
+                status=206,
+                content_type=content_type
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(length)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = cache_control
+
+    return response
@@ -0,0 +1,53 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Collapse tags/ingredients sharing a (user, name) into the oldest row"""
+    Recipe = apps.get_model('core', 'Recipe')
+
+    for model_name, relation in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, relation).through
+        fk = f'{model_name.lower()}_id'
+
+        duplicates = (
+            model.objects.values('user_id', 'name')
+            .annotate(keep_id=Min('id'), count=Count('id'))
+            .filter(count__gt=1)
+        )
+        for duplicate in duplicates.iterator():
+            keep_id = duplicate['keep_id']
+            merged_ids = list(
+                model.objects
+                .filter(user_id=duplicate['user_id'], name=duplicate['name'])
+                .exclude(id=keep_id)
+                .values_list('id', flat=True)
+            )
+
+            # A recipe may already link the kept row, or several merged rows;
+            # keep exactly one link per recipe so the through table stays unique.
+            linked = set(through.objects.filter(**{fk: keep_id}).values_list('recipe_id', flat=True))
+            stale, moved = [], []
+            rows = through.objects.filter(**{f'{fk}__in': merged_ids}).values_list('id', 'recipe_id')
+            for row_id, recipe_id in rows:
+                if recipe_id in linked:
+                    stale.append(row_id)
+                else:
+                    linked.add(recipe_id)
+                    moved.append(row_id)
+
+            through.objects.filter(id__in=stale).delete()
+            through.objects.filter(id__in=moved).update(**{fk: keep_id})
+            model.objects.filter(id__in=merged_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
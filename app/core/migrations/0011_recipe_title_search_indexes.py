@@ -0,0 +1,45 @@
+from django.db import migrations
+from django.db.models import F
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    from django.contrib.postgres.indexes import GinIndex, OpClass
+    from django.contrib.postgres.search import SearchVector
+
+    Recipe = apps.get_model('core', 'Recipe')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+    schema_editor.add_index(Recipe, GinIndex(
+        SearchVector('title', config='english'),
+        name='core_recipe_title_search_idx'
+    ))
+    schema_editor.add_index(Recipe, GinIndex(
+        OpClass(F('title'), name='gin_trgm_ops'),
+        name='core_recipe_title_trgm_idx'
+    ))
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS core_recipe_title_search_idx;')
+    schema_editor.execute('DROP INDEX IF EXISTS core_recipe_title_trgm_idx;')
+
+
+class Migration(migrations.Migration):
+    """
+    Index recipe titles for `RecipeQuerySet.search`: a full text GIN index
+    on the title's tsvector and a trigram GIN index for fuzzy matching.
+    Both are PostgreSQL only, other databases search without an index.
+    """
+
+    dependencies = [
+        ('core', '0010_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
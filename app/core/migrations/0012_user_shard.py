@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_title_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='shard',
+            field=models.CharField(default='default', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='shard_moving',
+            field=models.BooleanField(default=False),
+        ),
+    ]
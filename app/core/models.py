@@ -1,9 +1,18 @@
 import os
+import re
 import uuid
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models import Case, Count, Exists, FloatField, OuterRef, Q, Value, When
+from django.db.models.functions import Cast
+
+from core.db import sharding
+
+
+# Text search configuration of recipe title search and its index.
+SEARCH_CONFIG = 'english'
 
 
 def recipe_image_file_path(instance, filename):
@@ -18,10 +27,14 @@ class UserManager(BaseUserManager):
         if not email:
             raise ValueError('User must have an email address')
 
+        extra_fields.setdefault('shard', sharding.place_new_user())
         user = self.model(email=self.normalize_email(email), **extra_fields)
         user.set_password(password)
 
-        user.save(using=self._db)
+        with transaction.atomic(using=self._db or DEFAULT_DB_ALIAS):
+            user.save(using=self._db)
+            if user.shard != DEFAULT_DB_ALIAS:
+                sharding.copy_user(user, user.shard)
 
         return user
 
@@ -39,16 +52,38 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Database alias holding the user's recipes, tags and ingredients, see
+    # core.db.sharding. Writes are refused while they move to another shard.
+    shard = models.CharField(max_length=64, default='default')
+    shard_moving = models.BooleanField(default=False)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
 
+class RecipeAttrQuerySet(models.QuerySet):
+    """QuerySet for objects attached to recipes, such as tags and ingredients"""
+
+    def assigned(self):
+        """Return only objects used by at least one recipe"""
+        through = self.model.recipe_set.through
+        used = through.objects.filter(**{self.model._meta.model_name: OuterRef('pk')})
+
+        return self.filter(Exists(used))
+
+
 class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_name_per_user'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -57,10 +92,76 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'name'), name='unique_ingredient_name_per_user'),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self, relation, ids, match_all=False):
+        """
+        Return recipes linked to any (or, with `match_all`, every) object in
+        `ids` through the `relation` many-to-many field, each recipe once.
+        """
+        field = self.model._meta.get_field(relation)
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        ids = set(ids)
+        links = field.remote_field.through.objects.filter(**{f'{target}__in': ids})
+
+        if match_all:
+            matching = (
+                links.values(source)
+                .annotate(matched=Count(target))
+                .filter(matched=len(ids))
+                .values(source)
+            )
+            return self.filter(pk__in=matching)
+
+        return self.filter(Exists(links.filter(**{source: OuterRef('pk')})))
+
+    def search(self, term):
+        """
+        Return recipes whose title matches `term`, annotated with a
+        `search_rank` where higher is better.
+
+        PostgreSQL matches every word as a full text prefix or the whole term
+        fuzzily by trigram, both served by the GIN indexes of migration 0011.
+        Other databases fall back to case-insensitive substring matching.
+        """
+        words = re.findall(r'\w+', term)
+        if not words:
+            return self.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+        if connections[self.db].vendor == 'postgresql':
+            from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+
+            vector = SearchVector('title', config=SEARCH_CONFIG)
+            query = SearchQuery(' & '.join(f'{word}:*' for word in words), config=SEARCH_CONFIG, search_type='raw')
+            return self.alias(search_vector=vector).filter(
+                Q(search_vector=query) | Q(title__trigram_word_similar=term)
+            ).annotate(
+                # Both functions return real; double precision survives the
+                # round trip through a pagination cursor exactly.
+                search_rank=Cast(SearchRank(vector, query) + TrigramWordSimilarity(term, 'title'), FloatField())
+            )
+
+        matches = Q()
+        for word in words:
+            matches &= Q(title__icontains=word)
+        return self.filter(matches).annotate(search_rank=Case(
+            When(title__iexact=term, then=Value(3.0)),
+            When(title__istartswith=term, then=Value(2.0)),
+            default=Value(1.0),
+            output_field=FloatField()
+        ))
+
+
 class Recipe(models.Model):
     """Recipe Object"""
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -71,6 +172,15 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(blank=True, null=True, upload_to=recipe_image_file_path)
+    image_renditions = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('user', 'updated_at'), name='core_recipe_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.title
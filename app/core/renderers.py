@@ -0,0 +1,74 @@
+import io
+import re
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LONG_DIGIT_RUN = re.compile(rb'\d{20}')
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Anything orjson cannot encode natively (Decimal, lazy strings, ...) is
+    # converted exactly as DRF's encoder would.
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson when it is installed.
+
+    Output is byte-for-byte what `JSONRenderer` produces for compact, unicode
+    output. Indented output, ASCII-only output and anything orjson rejects
+    go through the stdlib encoder instead.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Match the stdlib renderer, which escapes these for JavaScript.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSON parser backed by orjson when it is installed, with stdlib fallback"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        # orjson reads integers beyond 64 bits as floats; leave any body that
+        # might contain one to the stdlib, which keeps them exact.
+        if LONG_DIGIT_RUN.search(body) is None:
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+
+        # Also re-parse invalid bodies so errors read like JSONParser's.
+        return super().parse(io.BytesIO(body), media_type, parser_context)
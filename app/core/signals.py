@@ -0,0 +1,45 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Ingredient, Recipe, Tag, User
+
+
+def touch_recipes(queryset):
+    """Bump `updated_at` on recipes whose representation changed indirectly"""
+    queryset.update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipes_on_link_change(sender, instance, action, reverse, pk_set, model, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_recipes(Recipe.objects.filter(pk=instance.pk))
+        return
+
+    # Reverse side: `instance` is a tag/ingredient and `pk_set` holds recipes.
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        touch_recipes(Recipe.objects.filter(pk__in=instance.__dict__.pop('_cleared_recipe_ids', [])))
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_on_attr_change(sender, instance, created=False, **kwargs):
+    """Renaming or deleting a tag/ingredient changes every recipe using it"""
+    if not created:
+        touch_recipes(instance.recipe_set.all())
+
+
+@receiver(post_delete, sender=User)
+def delete_sharded_data(sender, instance, using, **kwargs):
+    """Deleting a user only cascades on the primary; drop their copy, and so their data, on their shard"""
+    if using == DEFAULT_DB_ALIAS and instance.shard != DEFAULT_DB_ALIAS:
+        User.objects.using(instance.shard).filter(pk=instance.pk).delete()
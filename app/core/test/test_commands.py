@@ -1,24 +1,138 @@
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import QuerySet
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import Ingredient, Recipe, Tag
+
 
 class CommandTests(TestCase):
     def test_wait_for_db_ready(self):
         """ Test waiting for db ready when db is available """
 
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEquals(gi.call_count, 1)
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection') as ec:
+            call_command('wait_for_db', database=['default'], stdout=io.StringIO())
+            self.assertEqual(ec.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
-        """ Test waiting for db """
+        """ Test waiting for db, backing off exponentially """
+
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection') as ec:
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', database=['default'], stdout=io.StringIO())
+            self.assertEqual(ec.call_count, 6)
+        self.assertEqual([call.args[0] for call in ts.call_args_list], [0.1, 0.2, 0.4, 0.8, 1.6])
+
+    def test_wait_for_db_timeout(self):
+        """ Test waiting for db gives up after the timeout """
+
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection') as ec:
+            ec.side_effect = OperationalError('connection refused')
+            with self.assertRaisesMessage(CommandError, 'connection refused'):
+                call_command('wait_for_db', database=['default'], timeout=0, stdout=io.StringIO())
+
+
+class ImportRecipesCommandTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def _ndjson(self, rows):
+        return self._write('recipes.ndjson', ''.join(json.dumps(row) + '\n' for row in rows))
+
+    def test_import_ndjson(self):
+        """ Test importing recipes and deduplicating tags and ingredients """
+        Tag.objects.create(user=self.user, name='Vegan')
+        path = self._ndjson([
+            {
+                'title': 'Curry', 'time_minutes': 20, 'price': '5.50',
+                'tags': ['Vegan', 'Dinner'], 'ingredients': ['Rice'],
+            },
+            {'title': 'Salad', 'time_minutes': 5, 'price': 3, 'tags': ['Vegan'], 'ingredients': ['Rice', 'Rice']},
+        ])
+
+        call_command('import_recipes', path, user='sam@sam.com', batch_size=1, stdout=io.StringIO())
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(sorted(Tag.objects.values_list('name', flat=True)), ['Dinner', 'Vegan'])
+        self.assertEqual(Ingredient.objects.count(), 1)
+        curry = Recipe.objects.get(title='Curry')
+        self.assertEqual(sorted(curry.tags.values_list('name', flat=True)), ['Dinner', 'Vegan'])
+        self.assertEqual(curry.price, Decimal('5.50'))
+        self.assertEqual(Recipe.objects.get(title='Salad').ingredients.count(), 1)
+
+    def test_import_csv(self):
+        """ Test importing csv rows with separated names and per-row owners """
+        other = get_user_model().objects.create_user(email='other@sam.com', password='123456')
+        path = self._write('recipes.csv', (
+            'user,title,time_minutes,price,link,tags,ingredients\n'
+            'sam@sam.com,Curry,20,5.50,,Vegan;Dinner,Rice\n'
+            'other@sam.com,Soup,10,2.00,https://example.com,Vegan,\n'
+        ))
+
+        call_command('import_recipes', path, stdout=io.StringIO())
+
+        soup = Recipe.objects.get(title='Soup')
+        self.assertEqual(soup.user, other)
+        self.assertEqual(soup.link, 'https://example.com')
+        self.assertIsNone(Recipe.objects.get(title='Curry').link)
+        self.assertEqual(Tag.objects.filter(name='Vegan').count(), 2)
+
+    def test_import_skips_invalid_rows(self):
+        """ Test invalid rows are reported and skipped """
+        path = self._write('recipes.ndjson', '\n'.join([
+            json.dumps({'title': 'Curry', 'time_minutes': 20, 'price': '5.50'}),
+            '{not json',
+            json.dumps({'title': 'Too expensive', 'time_minutes': 1, 'price': '12345.00'}),
+            json.dumps({'title': 'Nobody', 'time_minutes': 1, 'price': '1', 'user': 'nobody@sam.com'}),
+        ]))
+        stderr = io.StringIO()
+
+        call_command('import_recipes', path, user='sam@sam.com', stdout=io.StringIO(), stderr=stderr)
+
+        self.assertEqual(list(Recipe.objects.values_list('title', flat=True)), ['Curry'])
+        self.assertEqual(stderr.getvalue().count('Skipping row'), 3)
+
+    def test_import_resumes_from_checkpoint(self):
+        """ Test an interrupted import continues after the last committed batch """
+        path = self._ndjson([{'title': f'Recipe {i}', 'time_minutes': i, 'price': '1.00'} for i in range(5)])
+        checkpoint = os.path.join(self.tmp.name, 'import.checkpoint')
+        bulk_create = QuerySet.bulk_create
+        calls = []
+
+        def failing_bulk_create(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 3:
+                raise OperationalError('connection lost')
+            return bulk_create(*args, **kwargs)
+
+        with patch.object(QuerySet, 'bulk_create', autospec=True, side_effect=failing_bulk_create):
+            with self.assertRaises(OperationalError):
+                call_command('import_recipes', path, user='sam@sam.com', batch_size=2,
+                             checkpoint=checkpoint, stdout=io.StringIO())
+        self.assertEqual(Recipe.objects.count(), 4)
+
+        call_command('import_recipes', path, user='sam@sam.com', batch_size=2,
+                     checkpoint=checkpoint, stdout=io.StringIO())
 
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEquals(gi.call_count, 6)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('title', flat=True)),
+            [f'Recipe {i}' for i in range(5)]
+        )
@@ -0,0 +1,82 @@
+import json
+from unittest import skipUnless
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.db.utils import OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.health import HealthCheckMiddleware
+
+
+class HealthCheckTests(TestCase):
+    """Test the liveness and readiness probes"""
+    databases = '__all__'
+
+    def test_liveness(self):
+        """Test liveness answers without touching the database"""
+        with self.assertNumQueries(0):
+            res = self.client.get('/healthz')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    def test_readiness(self):
+        """Test readiness reports a round trip to every database"""
+        res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 200)
+        data = res.json()
+        self.assertEqual(data['status'], 'ok')
+        self.assertTrue(data['databases']['default']['ok'])
+        self.assertGreaterEqual(data['databases']['default']['latency_ms'], 0)
+
+    def test_readiness_database_down(self):
+        """Test readiness fails when a database is unreachable"""
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection') as ec:
+            ec.side_effect = OperationalError('could not connect to server: secret-host')
+            res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['status'], 'unavailable')
+        self.assertEqual(res.json()['databases']['default'], {'ok': False, 'error': 'OperationalError'})
+
+    def test_pool_saturation(self):
+        """Test readiness reports the share of pooled connections in use"""
+        stats = {'default': {'size': 4, 'idle': 1, 'in_use': 3, 'waiting': 0, 'max_size': 10}}
+        with patch('core.health.get_pool_stats', return_value=stats):
+            res = self.client.get('/readyz')
+
+        self.assertEqual(res.json()['pools']['default']['saturation'], 0.3)
+
+    @override_settings(ALLOWED_HOSTS=['example.com'])
+    def test_probes_skip_middleware(self):
+        """Test probes by address skip host validation and authentication"""
+        self.assertEqual(self.client.get('/healthz', HTTP_HOST='10.0.0.7').status_code, 200)
+        self.assertEqual(self.client.get('/api/user/me/', HTTP_HOST='10.0.0.7').status_code, 400)
+
+    def test_async_probes(self):
+        """Test the probes are answered under ASGI without adapting the middleware"""
+        async def get_response(request):
+            return HttpResponse('app')
+
+        middleware = HealthCheckMiddleware(get_response)
+        factory = RequestFactory()
+
+        self.assertEqual(json.loads(async_to_sync(middleware)(factory.get('/healthz')).content), {'status': 'ok'})
+        res = async_to_sync(middleware)(factory.get('/readyz'))
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(json.loads(res.content)['databases']['default']['ok'])
+        self.assertEqual(async_to_sync(middleware)(factory.get('/api/')).content, b'app')
+
+    @skipUnless(connection.vendor == 'postgresql', 'Statement timeouts are set on PostgreSQL')
+    @override_settings(HEALTH_CHECKS={'DATABASE_TIMEOUT': 0.5})
+    def test_readiness_statement_timeout(self):
+        """Test the round trip is bounded by a statement timeout"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/readyz')
+
+        self.assertTrue(any("set_config('statement_timeout', '500', true)" in query['sql'] for query in queries))
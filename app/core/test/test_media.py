@@ -0,0 +1,88 @@
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+IMAGE_PATH = 'uploads/recipe/0b6e5d1c-6c1e-4c3a-9f3e-1d1a2b3c4d5e.jpg'
+CONTENT = bytes(range(256)) * 4
+
+
+class MediaServingTests(TestCase):
+    """Test serving uploaded media files"""
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        os.makedirs(os.path.join(self.media_root.name, 'uploads/recipe'))
+        with open(os.path.join(self.media_root.name, IMAGE_PATH), 'wb') as f:
+            f.write(CONTENT)
+        with open(os.path.join(self.media_root.name, 'notes.txt'), 'wb') as f:
+            f.write(b'notes')
+
+        settings_override = override_settings(MEDIA_ROOT=self.media_root.name, MEDIA_SERVE_MODE='django')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.url = reverse('media', args=[IMAGE_PATH])
+
+    def test_serve_file_with_validators(self):
+        """Test that uploads are served with an ETag and immutable caching"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+
+    def test_non_upload_not_immutable(self):
+        """Test that files not named by upload uuids get short caching"""
+        res = self.client.get(reverse('media', args=['notes.txt']))
+
+        self.assertNotIn('immutable', res['Cache-Control'])
+
+    def test_if_none_match(self):
+        """Test that a matching ETag returns 304"""
+        etag = self.client.get(self.url)['ETag']
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_byte_range(self):
+        """Test partial content responses"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[10:20])
+        self.assertEqual(res['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+
+        res = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[-5:])
+
+    def test_unsatisfiable_range(self):
+        """Test that a range past the end returns 416"""
+        res = self.client.get(self.url, HTTP_RANGE=f'bytes={len(CONTENT)}-')
+
+        self.assertEqual(res.status_code, 416)
+
+    def test_offload_to_web_server(self):
+        """Test that X-Accel-Redirect mode hands the file to nginx"""
+        with self.settings(MEDIA_SERVE_MODE='x-accel-redirect'):
+            res = self.client.get(self.url)
+
+        self.assertEqual(res['X-Accel-Redirect'], f'/protected-media/{IMAGE_PATH}')
+        self.assertEqual(res.content, b'')
+
+    def test_path_traversal_rejected(self):
+        """Test that files outside MEDIA_ROOT are not served"""
+        res = self.client.get('/media/uploads/..%2F..%2F..%2F..%2Fetc/passwd')
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_missing_file(self):
+        """Test that unknown files return 404"""
+        res = self.client.get(reverse('media', args=['uploads/recipe/missing.jpg']))
+
+        self.assertEqual(res.status_code, 404)
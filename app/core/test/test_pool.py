@@ -0,0 +1,164 @@
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase
+
+from core.db.pool import ConnectionPool, PooledDatabaseWrapperMixin, PoolTimeout, close_pool, get_pool_stats
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the generic connection pool"""
+
+    def _pool(self, **kwargs):
+        self.opened = []
+
+        def connect():
+            conn = FakeConnection()
+            self.opened.append(conn)
+            return conn
+
+        return ConnectionPool(connect, check=lambda conn: not conn.closed, **kwargs)
+
+    def test_connections_reused(self):
+        """Test a released connection is handed out again"""
+        pool = self._pool()
+        conn = pool.acquire()
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(), conn)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_min_size_opened_up_front(self):
+        """Test MIN_SIZE connections are opened when the pool is created"""
+        pool = self._pool(min_size=2)
+
+        self.assertEqual(len(self.opened), 2)
+        self.assertEqual(pool.stats()['idle'], 2)
+
+    def test_acquire_times_out_when_exhausted(self):
+        """Test checkout gives up after the timeout once MAX_SIZE are in use"""
+        pool = self._pool(max_size=1, timeout=0.01)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_released_connection(self):
+        """Test a waiting checkout is served by a release"""
+        pool = self._pool(max_size=1, timeout=5)
+        conn = pool.acquire()
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+        waiter.start()
+        while pool.stats()['waiting'] == 0:
+            pass
+
+        pool.release(conn)
+        waiter.join(5)
+
+        self.assertEqual(acquired, [conn])
+
+    def test_unhealthy_connection_replaced(self):
+        """Test a connection failing its health check is discarded on checkout"""
+        pool = self._pool(health_check_after=0)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.closed = True
+
+        replacement = pool.acquire()
+
+        self.assertIsNot(replacement, conn)
+        self.assertEqual(pool.stats()['discarded'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_idle_connections_reaped(self):
+        """Test connections idle for longer than MAX_IDLE are closed down to MIN_SIZE"""
+        pool = self._pool(min_size=1, max_idle=60)
+        for conn in [pool.acquire(), pool.acquire()]:
+            pool.release(conn)
+
+        later = time.monotonic() + 120
+        with patch('core.db.pool.time.monotonic', return_value=later):
+            pool.acquire()
+
+        self.assertEqual(sum(conn.closed for conn in self.opened), 1)
+        self.assertEqual(pool.stats()['reaped'], 1)
+
+    def test_stats(self):
+        """Test in-use, waiting and wait-time counters"""
+        pool = self._pool(max_size=2)
+        conn = pool.acquire()
+        pool.acquire()
+        pool.release(conn, discard=True)
+
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['in_use'], stats['waiting']), (1, 1, 0))
+        self.assertEqual(stats['acquired'], 2)
+        self.assertEqual(sum(stats['wait_time'].values()), 2)
+        self.assertTrue(conn.closed)
+
+    def test_invalid_sizes(self):
+        """Test a pool with MIN_SIZE above MAX_SIZE is rejected"""
+        with self.assertRaises(ValueError):
+            self._pool(min_size=3, max_size=2)
+
+
+class PooledSQLiteDatabaseWrapper(PooledDatabaseWrapperMixin, SQLiteDatabaseWrapper):
+    pass
+
+
+class PooledDatabaseWrapperTests(SimpleTestCase):
+    """Test Django connections checked out of the pool"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(close_pool, 'pooled')
+        settings_dict = {
+            **connection.settings_dict,
+            'NAME': os.path.join(tmp.name, 'pooled.sqlite3'),
+            'POOL': {'MAX_SIZE': 2, 'TIMEOUT': 0.01},
+        }
+        self.wrappers = [PooledSQLiteDatabaseWrapper(settings_dict, alias='pooled') for _ in range(3)]
+
+    def _query(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    def test_close_returns_connection_to_pool(self):
+        """Test a closed Django connection is reused by the next one"""
+        first, second = self.wrappers[:2]
+        self._query(first)
+        raw = first.connection
+        first.close()
+
+        self._query(second)
+
+        self.assertIs(second.connection, raw)
+        self.assertEqual(get_pool_stats()['pooled']['in_use'], 1)
+        second.close()
+
+    def test_exhausted_pool_raises_operational_error(self):
+        """Test a checkout timeout surfaces as a database OperationalError"""
+        self._query(self.wrappers[0])
+        self._query(self.wrappers[1])
+
+        with self.assertRaises(OperationalError):
+            self._query(self.wrappers[2])
+        for wrapper in self.wrappers[:2]:
+            wrapper.close()
@@ -0,0 +1,58 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.renderers import FastJSONParser, FastJSONRenderer
+
+SAMPLE = {
+    'results': [
+        {'id': 1, 'title': 'Crème brûlée  ', 'price': Decimal('5.50'), 'link': None, 'tags': [1, 2]},
+        {'id': 2, 'title': gettext_lazy('Salad'), 'price': '3.00', 'link': 'https://example.com', 'tags': []},
+    ],
+    'created': datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+    'day': datetime.date(2024, 1, 2),
+    1: 'non-string key',
+}
+
+
+class FastJSONTests(SimpleTestCase):
+    """Test the optional orjson-backed renderer and parser"""
+
+    def test_render_matches_stdlib(self):
+        """Test that output is byte-identical to DRF's JSONRenderer"""
+        self.assertEqual(FastJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE))
+
+    def test_render_indented_falls_back(self):
+        """Test that indented output uses the stdlib encoder"""
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE, media_type),
+            JSONRenderer().render(SAMPLE, media_type)
+        )
+
+    def test_render_without_orjson(self):
+        """Test that the stdlib path is used when orjson is missing"""
+        with patch.object(renderers, 'orjson', None):
+            self.assertEqual(FastJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE))
+
+    def test_parse_matches_stdlib(self):
+        """Test that parsing matches DRF's JSONParser, including huge integers"""
+        for body in (b'{"title": "Cr\\u00e8me", "price": "5.50", "tags": [1, 2]}', b'[18446744073709551617]'):
+            with self.subTest(body=body):
+                self.assertEqual(
+                    FastJSONParser().parse(io.BytesIO(body)),
+                    JSONParser().parse(io.BytesIO(body))
+                )
+
+    def test_parse_error(self):
+        """Test that malformed JSON raises a ParseError"""
+        with self.assertRaisesMessage(Exception, 'JSON parse error'):
+            FastJSONParser().parse(io.BytesIO(b'{"title": '))
@@ -0,0 +1,253 @@
+import json
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+from unittest import skipUnless
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.db.routers import ReplicaRouter, ReplicaRoutingMiddleware
+from core.models import Recipe, Tag
+
+REPLICA_ROUTING = {'REPLICAS': ['replica'], 'PIN_SECONDS': 10, 'CACHE_ALIAS': 'shared'}
+
+
+def _use_shared_cache(cls):
+    """Give the test class a 'shared' cache alias every process could see"""
+    cache_dir = tempfile.TemporaryDirectory()
+    cls.addClassCleanup(cache_dir.cleanup)
+    shared = override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir.name},
+    })
+    shared.enable()
+    cls.addClassCleanup(shared.disable)
+
+
+@override_settings(REPLICA_ROUTING=REPLICA_ROUTING)
+class ReplicaRouterTests(SimpleTestCase):
+    """Test reads are routed to replicas unless the user has to see their writes"""
+    # Not a TestCase: its transaction would send every read to the primary.
+    databases = {'default'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        _use_shared_cache(cls)
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.user = get_user_model()(pk=1, email='sam@sam.com')
+
+    def _serve(self, method='get', user=None, write=False, view=None):
+        """Serve a request through the middleware and return the alias recipe reads used"""
+        routed = []
+
+        def get_response(request):
+            if write:
+                self.router.db_for_write(Recipe)
+            if view is not None:
+                view()
+            routed.append(self.router.db_for_read(Recipe))
+            return HttpResponse()
+
+        request = getattr(self.factory, method)('/')
+        request.user = user or self.user
+        ReplicaRoutingMiddleware(get_response)(request)
+
+        return routed[0]
+
+    def test_reads_outside_request_use_primary(self):
+        """Test reads outside of a request, e.g. in commands, go to the primary"""
+        self.assertEqual(self.router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+
+    def test_safe_request_reads_replica(self):
+        """Test reads while serving a GET go to a replica"""
+        self.assertEqual(self._serve(), 'replica')
+
+    def test_unsafe_request_reads_primary(self):
+        """Test reads while serving a POST go to the primary"""
+        self.assertEqual(self._serve('post'), DEFAULT_DB_ALIAS)
+
+    def test_reads_after_write_use_primary(self):
+        """Test reads after a write in the same request go to the primary"""
+        self.assertEqual(self._serve(write=True), DEFAULT_DB_ALIAS)
+
+    def test_reads_before_authentication_use_primary(self):
+        """Test reads made while the user is not known yet go to the primary"""
+        routed = []
+
+        def get_user():
+            routed.append(self.router.db_for_read(get_user_model()))
+            return self.user
+
+        def view():
+            routed.append(self.router.db_for_read(Recipe))
+            request.user.pk
+            routed.append(self.router.db_for_read(Recipe))
+
+        request = self.factory.get('/')
+        request.user = SimpleLazyObject(get_user)
+        ReplicaRoutingMiddleware(lambda request: view() or HttpResponse())(request)
+
+        self.assertEqual(routed, [DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS, 'replica'])
+
+    def test_user_pinned_after_write(self):
+        """Test the user reads from the primary on their next requests, others do not"""
+        self._serve('post', write=True)
+
+        self.assertEqual(self._serve(), DEFAULT_DB_ALIAS)
+        self.assertEqual(self._serve(user=get_user_model()(pk=2)), 'replica')
+
+        caches['shared'].clear()
+        self.assertEqual(self._serve(), 'replica')
+
+    def test_anonymous_client_not_pinned(self):
+        """Test a write without a user does not pin anyone"""
+        self._serve('post', user=AnonymousUser(), write=True)
+
+        self.assertEqual(self._serve(user=AnonymousUser()), 'replica')
+
+    def test_reads_in_transaction_use_primary(self):
+        """Test reads inside a transaction go to the primary"""
+        def view():
+            with transaction.atomic():
+                routed.append(self.router.db_for_read(Recipe))
+
+        routed = []
+        self._serve(view=view)
+
+        self.assertEqual(routed, [DEFAULT_DB_ALIAS])
+
+    def test_primary_models(self):
+        """Test tokens are always read from the primary"""
+        def view():
+            routed.extend([self.router.db_for_read(Token), self.router.db_for_read(Tag)])
+
+        routed = []
+        self._serve(view=view)
+
+        self.assertEqual(routed, [DEFAULT_DB_ALIAS, 'replica'])
+
+    def test_no_migrations_on_replicas(self):
+        """Test the schema is only migrated on the primary"""
+        self.assertIs(self.router.allow_migrate('replica', 'core'), False)
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'core'))
+
+    @override_settings(REPLICA_ROUTING={})
+    def test_no_replicas(self):
+        """Test everything goes to the primary when no replica is configured"""
+        self.assertEqual(self._serve(), DEFAULT_DB_ALIAS)
+
+    @override_settings(REPLICA_ROUTING={**REPLICA_ROUTING, 'CACHE_ALIAS': 'default'})
+    def test_process_local_cache_refused(self):
+        """Test replicas are refused with pins only the writing process would see"""
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+    def test_async_middleware(self):
+        """Test the middleware routes and pins under ASGI too"""
+        async def get_response(request):
+            if request.method == 'POST':
+                self.router.db_for_write(Recipe)
+            routed.append(self.router.db_for_read(Recipe))
+            return HttpResponse()
+
+        routed = []
+        middleware = ReplicaRoutingMiddleware(get_response)
+        for method in ('get', 'post', 'get'):
+            request = getattr(self.factory, method)('/')
+            request.user = self.user
+            async_to_sync(middleware)(request)
+
+        self.assertEqual(routed, ['replica', DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Snapshots the primary with the SQLite backup API')
+@override_settings(REPLICA_ROUTING=REPLICA_ROUTING)
+class ReplicaRoutingApiTests(TransactionTestCase):
+    """Test read-your-writes through the API against a real replica that lags behind"""
+    databases = {'default'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        _use_shared_cache(cls)
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456')
+        self.client = APIClient()
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        # The replica is a copy of the primary that never catches up.
+        replica_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(replica_dir.cleanup)
+        path = os.path.join(replica_dir.name, 'replica.sqlite3')
+        connection.ensure_connection()
+        with closing(sqlite3.connect(path)) as replica:
+            connection.connection.backup(replica)
+        connections.settings['replica'] = {**connections.settings[DEFAULT_DB_ALIAS], 'NAME': path}
+        self.addCleanup(self._remove_replica)
+
+    def tearDown(self):
+        for alias in caches:
+            caches[alias].clear()
+
+    def _remove_replica(self):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+
+    @async_to_sync
+    async def _aget(self, url):
+        return await self.async_client.get(url, headers={'Authorization': f'Token {self.token.key}'})
+
+    def _titles(self, client):
+        res = client.get(reverse('recipe:recipe-list'))
+        self.assertEqual(res.status_code, 200)
+
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_created_recipe_visible_on_next_get(self):
+        """Test a recipe created through the API is listed by the next GET, on any device"""
+        res = self.client.post(reverse('recipe:recipe-list'), {'title': 'Pilaf', 'time_minutes': 30, 'price': '7.00'})
+        self.assertEqual(res.status_code, 201)
+
+        self.assertEqual(self._titles(self.client), ['Pilaf'])
+        other_device = APIClient()
+        other_device.force_authenticate(self.user)
+        self.assertEqual(self._titles(other_device), ['Pilaf'])
+
+    def test_reads_use_replica_once_unpinned(self):
+        """Test list reads go to the lagging replica when the user is not pinned"""
+        self.client.post(reverse('recipe:recipe-list'), {'title': 'Pilaf', 'time_minutes': 30, 'price': '7.00'})
+        for alias in caches:
+            caches[alias].clear()
+
+        self.assertEqual(self._titles(self.client), [])
+
+    def test_async_reads_use_replica_once_unpinned(self):
+        """Test the async list reads from the lagging replica when the user is not pinned"""
+        self.client.post(reverse('recipe:recipe-list'), {'title': 'Pilaf', 'time_minutes': 30, 'price': '7.00'})
+        for alias in caches:
+            caches[alias].clear()
+
+        res = self._aget(reverse('recipe:async-recipe-list'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(json.loads(res.content)['results'], [])
@@ -0,0 +1,184 @@
+import io
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.db.routers import ShardRouter
+from core.db.sharding import (
+    get_current_shard, get_id_range, get_shards, iterate_on_shard, place_new_user, use_shard
+)
+from core.models import Ingredient, Recipe, Tag
+
+# Test databases are set up for every class, skipped or not: only ask for
+# the second shard when it is configured.
+SECOND_SHARD = 'shard_1' in get_shards() and 'shard_1' in settings.DATABASES
+SHARD_DATABASES = {'default', 'shard_1'} if SECOND_SHARD else {'default'}
+
+
+@override_settings(USER_SHARDING={'SHARDS': ['default', 'shard_x']})
+class ShardRouterTests(SimpleTestCase):
+    """Test queries on sharded models follow the active shard"""
+
+    def setUp(self):
+        self.router = ShardRouter()
+
+    def test_active_shard(self):
+        """Test sharded models and their many-to-many tables use the active shard"""
+        with use_shard('shard_x'):
+            self.assertEqual(self.router.db_for_read(Recipe), 'shard_x')
+            self.assertEqual(self.router.db_for_write(Recipe.tags.through), 'shard_x')
+            self.assertIsNone(self.router.db_for_read(get_user_model()))
+
+    def test_primary_left_to_other_routers(self):
+        """Test the primary shard and the lack of any are left to the next router"""
+        self.assertIsNone(self.router.db_for_read(Recipe))
+        with use_shard(DEFAULT_DB_ALIAS):
+            self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_instance_hints(self):
+        """Test outside of requests the instance at hand gives the shard"""
+        user = get_user_model()(pk=1, shard='shard_x')
+        tag = Tag(user=user, name='Vegan')
+
+        self.assertEqual(self.router.db_for_write(Tag, instance=tag), 'shard_x')
+        self.assertEqual(self.router.db_for_read(Recipe, instance=user), 'shard_x')
+        tag._state.db = DEFAULT_DB_ALIAS
+        self.assertIsNone(self.router.db_for_read(Recipe, instance=tag))
+
+    def test_allow_relation(self):
+        """Test users relate to rows on any shard, other rows only within one"""
+        user = get_user_model()(pk=1)
+        user._state.db = DEFAULT_DB_ALIAS
+        tag, ingredient = Tag(), Ingredient()
+        tag._state.db = ingredient._state.db = 'shard_x'
+
+        self.assertIs(self.router.allow_relation(user, tag), True)
+        self.assertIs(self.router.allow_relation(tag, ingredient), True)
+        ingredient._state.db = DEFAULT_DB_ALIAS
+        self.assertIsNone(self.router.allow_relation(tag, ingredient))
+
+    def test_iterate_on_shard(self):
+        """Test a lazily consumed iterable runs with the shard active"""
+        seen = []
+
+        def items():
+            for i in range(2):
+                seen.append(get_current_shard())
+                yield i
+
+        self.assertEqual(list(iterate_on_shard('shard_x', items())), [0, 1])
+        self.assertEqual(seen, ['shard_x', 'shard_x'])
+        self.assertIsNone(get_current_shard())
+
+    def test_id_ranges(self):
+        """Test every shard draws ids from its own range"""
+        self.assertEqual(get_id_range('default'), (1, 2 ** 40))
+        self.assertEqual(get_id_range('shard_x'), (2 ** 40 + 1, 2 ** 41))
+
+
+class NewUserPlacementTests(TestCase):
+    """Test new users are placed on the shard with the fewest users"""
+    databases = SHARD_DATABASES
+
+    @override_settings(USER_SHARDING={'SHARDS': ['default']})
+    def test_single_shard(self):
+        """Test a single shard takes every new user without a query"""
+        with self.assertNumQueries(0):
+            self.assertEqual(place_new_user(), 'default')
+
+    @override_settings(USER_SHARDING={'SHARDS': ['default', 'shard_x'], 'NEW_USER_SHARDS': ['shard_x']})
+    def test_restricted_shards(self):
+        """Test new users only go to the configured shards"""
+        self.assertEqual(place_new_user(), 'shard_x')
+
+    @skipUnless(SECOND_SHARD, 'Needs a second shard, see DB_SHARD_HOSTS')
+    @override_settings(USER_SHARDING={'SHARDS': ['default', 'shard_1']})
+    def test_least_loaded_shard(self):
+        """Test users are spread over the shards, with a copy on the shard holding their data"""
+        first = get_user_model().objects.create_user(email='sam@sam.com', password='123456')
+        second = get_user_model().objects.create_user(email='other@sam.com', password='123456')
+
+        self.assertEqual([first.shard, second.shard], ['default', 'shard_1'])
+        self.assertEqual(get_user_model().objects.using('shard_1').get().email, 'other@sam.com')
+        with use_shard(second.shard):
+            Recipe.objects.create(user=second, title='Soup', time_minutes=5, price='1.00')
+
+
+@skipUnless(SECOND_SHARD, 'Needs a second shard, see DB_SHARD_HOSTS')
+class MoveUsersCommandTests(TestCase):
+    databases = SHARD_DATABASES
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456')
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe = Recipe.objects.create(user=self.user, title='Curry', time_minutes=5, price='2.00')
+        self.recipe.tags.add(self.tag)
+
+    def _move(self, *args, **kwargs):
+        call_command('move_users', *args, drain_seconds=0, stdout=io.StringIO(), **kwargs)
+        self.user.refresh_from_db()
+
+    def test_move_user(self):
+        """Test a user's rows move to the other shard with their ids and links"""
+        self._move('sam@sam.com', to='shard_1')
+
+        self.assertEqual(self.user.shard, 'shard_1')
+        self.assertFalse(self.user.shard_moving)
+        self.assertFalse(Recipe.objects.using('default').exists())
+        self.assertFalse(Recipe.tags.through.objects.using('default').exists())
+        recipe = Recipe.objects.using('shard_1').get(user=self.user)
+        self.assertEqual((recipe.pk, recipe.title), (self.recipe.pk, 'Curry'))
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+
+    def test_move_back(self):
+        """Test moving back restores the rows on the primary and drops the shard's copy"""
+        self._move('sam@sam.com', to='shard_1')
+        self._move('sam@sam.com', to='default')
+
+        self.assertEqual(self.user.shard, 'default')
+        self.assertEqual(list(Recipe.objects.using('default').get().tags.all()), [self.tag])
+        self.assertFalse(get_user_model().objects.using('shard_1').exists())
+        self.assertFalse(Recipe.objects.using('shard_1').exists())
+
+    def test_new_rows_use_shard_id_range(self):
+        """Test rows created on a shard get ids of its range, apart from moved ones"""
+        self._move('sam@sam.com', to='shard_1')
+
+        with use_shard('shard_1'):
+            recipe = Recipe.objects.create(user=self.user, title='Soup', time_minutes=5, price='1.00')
+
+        first, last = get_id_range('shard_1')
+        self.assertTrue(first <= recipe.pk <= last)
+
+    def test_rebalance(self):
+        """Test rebalancing moves users off the fuller shard"""
+        other = get_user_model().objects.create_user(email='other@sam.com', password='123456')
+        Recipe.objects.create(user=other, title='Soup', time_minutes=5, price='1.00')
+
+        self._move(rebalance=True)
+
+        other.refresh_from_db()
+        self.assertEqual(sorted([self.user.shard, other.shard]), ['default', 'shard_1'])
+
+    def test_invalid_arguments(self):
+        """Test unknown shards and users are rejected"""
+        with self.assertRaises(CommandError):
+            self._move('sam@sam.com', to='shard_9')
+        with self.assertRaises(CommandError):
+            self._move('nobody@sam.com', to='shard_1')
+        with self.assertRaises(CommandError):
+            self._move('sam@sam.com', rebalance=True)
+
+    def test_delete_user_on_shard(self):
+        """Test deleting a user also deletes their rows on their shard"""
+        self._move('sam@sam.com', to='shard_1')
+
+        self.user.delete()
+
+        self.assertFalse(Recipe.objects.using('shard_1').exists())
+        self.assertFalse(get_user_model().objects.using('shard_1').exists())
@@ -0,0 +1,114 @@
+import io
+import json
+import logging
+import re
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.timing import RequestTimingMiddleware
+
+RECIPE_URL = reverse('recipe:recipe-list')
+SERVER_TIMING = re.compile(
+    r'^db;dur=[\d.]+;desc="(\d+) queries", serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=[\d.]+$'
+)
+
+
+@override_settings(REQUEST_TIMING={'SAMPLE_RATE': 1})
+class RequestTimingTests(TestCase):
+    """Test per-request timings in Server-Timing headers and logs"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456')
+        Recipe.objects.create(user=self.user, title='Curry', time_minutes=5, price='2.00')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Capture what the configured handler writes, keeping test output clean.
+        handler, = logging.getLogger('core.timing').handlers
+        self.log = io.StringIO()
+        self.addCleanup(handler.setStream, handler.setStream(self.log))
+
+    @async_to_sync
+    async def _aget(self, url, token):
+        return await self.async_client.get(url, headers={'Authorization': f'Token {token.key}'})
+
+    def test_server_timing(self):
+        """Test the header reports db, serialize, render and total time"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPE_URL)
+
+        match = SERVER_TIMING.match(res['Server-Timing'])
+        self.assertIsNotNone(match, res['Server-Timing'])
+        self.assertEqual(int(match.group(1)), len(queries))
+
+    def test_structured_log(self):
+        """Test each timed request logs one JSON line"""
+        with self.assertLogs('core.timing', 'INFO') as logs, CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPE_URL)
+
+        data = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].timing, data)
+        self.assertEqual((data['method'], data['path'], data['status']), ('GET', RECIPE_URL, 200))
+        self.assertEqual(data['db_queries'], len(queries))
+        self.assertEqual(set(data), {
+            'method', 'path', 'status', 'db_queries', 'db_ms', 'serialize_ms', 'render_ms', 'total_ms'
+        })
+
+    def test_log_handler(self):
+        """Test the configured handler writes the timing lines logged at INFO"""
+        self.client.get(RECIPE_URL)
+
+        self.assertEqual(json.loads(self.log.getvalue())['path'], RECIPE_URL)
+
+    def test_async_request(self):
+        """Test requests served by async views are timed under ASGI, queries included"""
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(RequestTimingMiddleware(get_response)))
+        token = Token.objects.create(user=self.user)
+        url = reverse('recipe:async-recipe-list')
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self._aget(url, token)
+
+        self.assertEqual(res.status_code, 200)
+        match = re.match(r'^db;dur=[\d.]+;desc="(\d+) queries", total;dur=[\d.]+$', res['Server-Timing'])
+        self.assertIsNotNone(match, res['Server-Timing'])
+        self.assertEqual(int(match.group(1)), len(queries))
+
+    @override_settings(REQUEST_TIMING={'SAMPLE_RATE': 1, 'HEADER': False})
+    def test_header_disabled(self):
+        """Test timings can be logged without exposing them to clients"""
+        with self.assertLogs('core.timing', 'INFO'):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(REQUEST_TIMING={'SAMPLE_RATE': 0.25})
+    def test_sampling(self):
+        """Test only the sampled share of requests is timed"""
+        with patch('core.timing.random.random', side_effect=[0.5, 0.1]):
+            self.assertNotIn('Server-Timing', self.client.get(RECIPE_URL))
+            self.assertIn('Server-Timing', self.client.get(RECIPE_URL))
+
+    @override_settings(REQUEST_TIMING={'SAMPLE_RATE': 0})
+    def test_disabled(self):
+        """Test the middleware is left out entirely when turned off"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with patch('core.timing.random.random') as sample:
+            res = client.get(RECIPE_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        sample.assert_not_called()
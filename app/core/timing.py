@@ -0,0 +1,157 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Share of requests timed. 0 leaves the middleware out altogether.
+    'SAMPLE_RATE': 0.0,
+    # Send a Server-Timing header, which exposes the timings to clients.
+    'HEADER': True,
+    # Log one structured line per timed request.
+    'LOG': True,
+}
+
+
+def _setting(name):
+    return getattr(settings, 'REQUEST_TIMING', {}).get(name, DEFAULTS[name])
+
+
+def _wrap_connections(stack, timing):
+    """Time every query of this thread's connections until `stack` closes"""
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(timing))
+
+
+class _Timing:
+    """Timings of one request, collecting SQL timings as a database execute wrapper"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.view_started = self.view_db = self.view_ended = self.rendered = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db += time.perf_counter() - start
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+        self.view_db = self.db
+
+    def end_view(self, response):
+        self.view_ended = time.perf_counter()
+        self.view_db = self.db - self.view_db
+        response.add_post_render_callback(self.end_render)
+
+    def end_render(self, response):
+        self.rendered = time.perf_counter()
+
+    def metrics(self, total):
+        """Return `(name, milliseconds)` pairs; serialize and render only for template-like responses"""
+        metrics = [('db', self.db)]
+        if self.view_ended is not None:
+            # The view's own time outside SQL, which for API views is serialization.
+            metrics.append(('serialize', self.view_ended - self.view_started - self.view_db))
+        if self.rendered is not None:
+            metrics.append(('render', self.rendered - self.view_ended))
+        metrics.append(('total', total))
+
+        return [(name, round(seconds * 1000, 3)) for name, seconds in metrics]
+
+
+class RequestTimingMiddleware:
+    """
+    Time a sample of requests: SQL query count and time, the view's time
+    outside SQL, response rendering and the total. Timings go out as a
+    `Server-Timing` header and a structured log line.
+
+    Place right after HealthCheckMiddleware so the total covers every other
+    middleware. Bodies streamed after the response returned, such as
+    exports, are not covered.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not _setting('SAMPLE_RATE'):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= _setting('SAMPLE_RATE'):
+            return self.get_response(request)
+
+        timing = request._timing = _Timing()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            _wrap_connections(stack, timing)
+            response = self.get_response(request)
+
+        self.report(request, response, timing.metrics(time.perf_counter() - start), timing.queries)
+
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= _setting('SAMPLE_RATE'):
+            return await self.get_response(request)
+
+        timing = request._timing = _Timing()
+        start = time.perf_counter()
+        # Async ORM queries run in the thread sync_to_async uses for the
+        # request, on that thread's connections.
+        with ExitStack() as stack:
+            await sync_to_async(_wrap_connections)(stack, timing)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+
+        self.report(request, response, timing.metrics(time.perf_counter() - start), timing.queries)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, '_timing', None)
+        if timing is not None:
+            timing.start_view()
+
+    def process_template_response(self, request, response):
+        timing = getattr(request, '_timing', None)
+        if timing is not None and timing.view_started is not None:
+            timing.end_view(response)
+
+        return response
+
+    def report(self, request, response, metrics, queries):
+        if _setting('HEADER'):
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={ms}' + (f';desc="{queries} queries"' if name == 'db' else '')
+                for name, ms in metrics
+            )
+
+        if _setting('LOG'):
+            data = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'db_queries': queries,
+                **{f'{name}_ms': ms for name, ms in metrics},
+            }
+            logger.info(json.dumps(data), extra={'timing': data})
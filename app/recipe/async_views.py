@@ -0,0 +1,104 @@
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+
+from core.db.sharding import aget_user_shard, use_shard
+from core.renderers import FastJSONRenderer
+from recipe import views
+from recipe.fast_serializers import ValuesPlan
+from user.authentication import CachedTokenAuthentication
+
+
+class AsyncReadView(View):
+    """
+    Natively async list and retrieve for a read-only use of a viewset.
+
+    Querysets, filters, serializers and pagination all come from `viewset`,
+    so responses match the sync endpoints, while the rows are read with the
+    async ORM and rendered through a ValuesPlan, never blocking the event
+    loop or taking a thread-pool slot for the whole request. Response caching
+    and conditional GET are left to the sync endpoints.
+    """
+    viewset = None
+    authentication = CachedTokenAuthentication()
+    renderer = FastJSONRenderer()
+
+    async def get(self, request, pk=None):
+        try:
+            auth = await self.authentication.aauthenticate(request)
+            if auth is None:
+                raise exceptions.NotAuthenticated()
+            # Tell ReplicaRouter whose reads these are, or they all go to the primary.
+            request.user, request.auth = auth
+
+            shard, _ = await aget_user_shard(auth[0].pk)
+            with use_shard(shard):
+                view = self.get_viewset(request, auth, pk)
+                plan = ValuesPlan(view.get_serializer())
+                queryset = view.filter_queryset(view.get_queryset()).prefetch_related(None)
+                if pk is None:
+                    data = await self.list(view, plan, queryset)
+                else:
+                    data = await self.retrieve(view, plan, queryset, pk)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+        return self.render(data)
+
+    def get_viewset(self, request, auth, pk):
+        drf_request = Request(request)
+        drf_request.user, drf_request.auth = auth
+
+        return self.viewset(
+            request=drf_request,
+            action='list' if pk is None else 'retrieve',
+            args=(),
+            kwargs={} if pk is None else {'pk': pk},
+            format_kwarg=None
+        )
+
+    async def list(self, view, plan, queryset):
+        paginator = view.paginator
+        ordering = [field.lstrip('-') for field in getattr(paginator, 'ordering', ())]
+        queryset = queryset.values(*dict.fromkeys(plan.columns + ordering))
+
+        if paginator is not None:
+            page = await paginator.apaginate_queryset(queryset, view.request, view=view)
+            if page is not None:
+                return paginator.get_paginated_data(await plan.arender(page))
+
+        return await plan.arender([row async for row in queryset.aiterator()])
+
+    async def retrieve(self, view, plan, queryset, pk):
+        try:
+            row = await queryset.values(*plan.columns).aget(pk=pk)
+        except (queryset.model.DoesNotExist, TypeError, ValueError):
+            raise exceptions.NotFound()
+
+        return (await plan.arender([row]))[0]
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(self.renderer.render(data), status=status_code, content_type='application/json')
+
+    def handle_exception(self, exc):
+        # Mirror DRF's default exception handler.
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = self.render(data, exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response.status_code = status.HTTP_401_UNAUTHORIZED
+            response['WWW-Authenticate'] = self.authentication.authenticate_header(request=None)
+
+        return response
+
+
+class AsyncRecipeView(AsyncReadView):
+    viewset = views.RecipeViewSet
+
+
+class AsyncTagView(AsyncReadView):
+    viewset = views.TagViewSet
+
+
+class AsyncIngredientView(AsyncReadView):
+    viewset = views.IngredientViewSet
@@ -0,0 +1,176 @@
+import hashlib
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.cache import is_shared
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+    # Used instead of TIMEOUT with a process-local cache (LocMemCache), whose
+    # entries other processes' writes cannot invalidate.
+    'LOCAL_TIMEOUT': 10,
+}
+
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _setting(name):
+    return getattr(settings, 'RECIPE_LIST_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def _cache():
+    return caches[_setting('CACHE_ALIAS')]
+
+
+def _timeout():
+    if is_shared(_setting('CACHE_ALIAS')):
+        return _setting('TIMEOUT')
+
+    return min(_setting('TIMEOUT'), _setting('LOCAL_TIMEOUT'))
+
+
+def _version_timeout():
+    # List ETags are derived from the version too, so with a process-local
+    # cache it must expire as soon as the entries: a write in another process
+    # does not bump it here, and a 304 would keep confirming stale data.
+    return None if is_shared(_setting('CACHE_ALIAS')) else _setting('LOCAL_TIMEOUT')
+
+
+def _version_key(user_id):
+    return f'recipe-cache-version:{user_id}'
+
+
+def _fresh_version():
+    # Seeding from the clock means a version key lost to eviction is never
+    # recreated with a value an older cached response was stored under.
+    return time.time_ns() // 1000
+
+
+def get_user_version(user_id):
+    """Return the current cache version for a user's recipe data"""
+    cache = _cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), _fresh_version(), _version_timeout())
+        version = cache.get(_version_key(user_id))
+
+    return version
+
+
+def bump_user_version(user_id, using=None):
+    """
+    Invalidate every cached list response of a user once the transaction on
+    `using` commits, so a concurrent read cannot cache pre-commit data under
+    the new version.
+    """
+    transaction.on_commit(partial(_bump_user_version, user_id), using=using)
+
+
+def start_user_version(user_id):
+    """Give a new user a fresh version, in case a deleted user's id is reused"""
+    _cache().set(_version_key(user_id), _fresh_version(), _version_timeout())
+
+
+def _bump_user_version(user_id):
+    cache = _cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), _fresh_version(), _version_timeout())
+
+
+def get_stats():
+    """Return hit/miss counters and the hit ratio for this process"""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / total if total else 0.0
+
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _query_hash(request):
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+
+    return hashlib.sha1(repr((request.get_host(), params)).encode('utf-8')).hexdigest()
+
+
+def get_or_compute(request, name, compute):
+    """Return `compute()` cached per user and query, invalidated like the lists"""
+    version = get_user_version(request.user.pk)
+    key = f'recipe-{name}:{request.user.pk}:{version}:{_query_hash(request)}'
+    data = _cache().get(key)
+    if data is not None:
+        _count('hits')
+        return data
+
+    _count('misses')
+    data = compute()
+    _cache().set(key, data, _timeout())
+
+    return data
+
+
+class CachedListMixin:
+    """
+    Cache the serialized `list` response per user, endpoint and query.
+
+    Keys embed the user's version counter, which signals bump on any write
+    to their recipes, tags or ingredients, so stale entries are never read
+    and simply expire.
+    """
+
+    def list_cache_key(self, request):
+        version = get_user_version(request.user.pk)
+
+        return f'recipe-list:{request.user.pk}:{version}:{self.basename}:{_query_hash(request)}'
+
+    def list(self, request, *args, **kwargs):
+        key = self.list_cache_key(request)
+        cached = _cache().get(key)
+        if cached is not None:
+            _count('hits')
+            data, headers = cached
+            if 'ETag' in headers:
+                not_modified = get_conditional_response(
+                    request,
+                    etag=headers['ETag'],
+                    last_modified=parse_http_date_safe(headers.get('Last-Modified'))
+                )
+                if not_modified is not None:
+                    return not_modified
+
+            return Response(data, headers=headers)
+
+        _count('misses')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            # Keep validators set by ConditionalGetMixin so hits can answer 304.
+            headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+            _cache().set(key, (response.data, headers), _timeout())
+
+        return response
@@ -0,0 +1,89 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from recipe.cache import get_user_version
+
+
+def _etag(*parts):
+    return '"' + hashlib.sha1(repr(parts).encode('utf-8')).hexdigest() + '"'
+
+
+def conditional_response(request, etag, last_modified):
+    """Return a 304 response if the request's validators still match"""
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+
+
+class ConditionalGetMixin:
+    """
+    Answer `If-None-Match` on list and retrieve, and `If-Modified-Since` on
+    retrieve, without loading or serializing any rows.
+
+    List ETags come from the user's cache version, which any write to their
+    recipes, tags or ingredients bumps, so lists cost no query at all.
+    Retrieve validators come from the row's `updated_at` column. Lists get no
+    `Last-Modified`, as the version is not a time.
+    """
+
+    def _variant(self, request):
+        return request.user.pk, request.get_host(), request.accepted_renderer.format
+
+    def list_validators(self, request):
+        version = get_user_version(request.user.pk)
+        params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+
+        return _etag(self._variant(request), self.basename, params, version), None
+
+    def retrieve_validators(self, request):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            updated_at = (
+                self.get_queryset().prefetch_related(None)
+                .filter(**{self.lookup_field: lookup})
+                .values_list('updated_at', flat=True)
+                .first()
+            )
+        except (TypeError, ValueError, ValidationError):
+            # Let the regular retrieve turn a malformed lookup into a 404.
+            return None, None
+        if updated_at is None:
+            return None, None
+
+        params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+
+        # HTTP dates have whole seconds, so `If-Modified-Since` must compare in seconds.
+        last_modified = int(updated_at.timestamp())
+
+        return _etag(self._variant(request), lookup, params, updated_at.timestamp()), last_modified
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.list_validators(request)
+        not_modified = conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().list(request, *args, **kwargs)
+        set_validators(response, etag, last_modified)
+
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = self.retrieve_validators(request)
+        if etag is not None:
+            not_modified = conditional_response(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+        response = super().retrieve(request, *args, **kwargs)
+        if etag is not None:
+            set_validators(response, etag, last_modified)
+
+        return response
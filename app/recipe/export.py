@@ -0,0 +1,54 @@
+import csv
+from itertools import islice
+
+from core.renderers import FastJSONRenderer
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+CSV_LIST_SEPARATOR = ';'
+
+
+class _Echo:
+    """File-like object that hands each written csv line straight back"""
+
+    def write(self, value):
+        return value
+
+
+def iter_chunks(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def render_rows(plan, rows, chunk_size):
+    """Render `values()` rows chunk by chunk, fetching M2M ids once per chunk"""
+    for chunk in iter_chunks(rows, chunk_size):
+        yield from plan.render(chunk)
+
+
+def stream_ndjson(items):
+    renderer = FastJSONRenderer()
+    for item in items:
+        yield renderer.render(item) + b'\n'
+
+
+def stream_csv(items, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for item in items:
+        yield writer.writerow([_csv_value(item.get(field)) for field in fields])
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return CSV_LIST_SEPARATOR.join(str(v) for v in value)
+
+    return value
@@ -0,0 +1,177 @@
+from collections import defaultdict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+
+class UnsupportedField(Exception):
+    """Raised when a serializer field cannot be rendered from `values()` rows"""
+
+
+class ValuesPlan:
+    """
+    Precomputed plan for rendering a ModelSerializer from `values()` rows.
+
+    The plan is compiled once from a serializer instance and then applied to
+    every row, reusing each field's own `to_representation` so the output is
+    identical to the regular serializer without instantiating models.
+    Many-to-many relations are fetched with one through-table query each.
+    """
+
+    def __init__(self, serializer, nested=False):
+        model = serializer.Meta.model
+        self.columns = []
+        self.fields = []
+        self.relations = []
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            if isinstance(field, ManyRelatedField) and isinstance(field.child_relation, PrimaryKeyRelatedField):
+                child = None
+            elif isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.ModelSerializer):
+                child = ValuesPlan(field.child, nested=True)
+            else:
+                column = _column(model, field)
+                self.columns.append(column)
+                self.fields.append((name, column, field.to_representation))
+                continue
+
+            if nested:
+                raise UnsupportedField(name)
+            self.relations.append((name, _relation(model, field.source), child))
+            self.fields.append((name, None, None))
+
+        if self.relations and 'id' not in self.columns:
+            self.columns.append('id')
+
+    def render_row(self, row, related=None):
+        item = {}
+        for name, column, to_representation in self.fields:
+            if column is None:
+                item[name] = related[name].get(row['id'], [])
+            else:
+                value = row[column]
+                item[name] = None if value is None else to_representation(value)
+
+        return item
+
+    def render(self, rows):
+        """Render a list of `values()` dicts"""
+        related = {}
+        if self.relations and rows:
+            ids = [row['id'] for row in rows]
+            for name, relation, child in self.relations:
+                related[name] = _fetch_related(relation, ids, child)
+
+        return [self.render_row(row, related) for row in rows]
+
+    async def arender(self, rows):
+        """Async `render`, for native async views"""
+        related = {}
+        if self.relations and rows:
+            ids = [row['id'] for row in rows]
+            for name, relation, child in self.relations:
+                related[name] = await _afetch_related(relation, ids, child)
+
+        return [self.render_row(row, related) for row in rows]
+
+
+def _column(model, field):
+    if isinstance(field, serializers.SerializerMethodField) or field.source == '*' or '.' in field.source:
+        raise UnsupportedField(field.field_name)
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        raise UnsupportedField(field.field_name)
+    if not model_field.concrete or model_field.many_to_many or isinstance(model_field, models.FileField):
+        # File fields render through storage urls built from the instance.
+        raise UnsupportedField(field.field_name)
+
+    return model_field.attname
+
+
+def _relation(model, source):
+    try:
+        field = model._meta.get_field(source)
+    except FieldDoesNotExist:
+        raise UnsupportedField(source)
+    if not field.many_to_many or field.model is not model:
+        raise UnsupportedField(source)
+
+    return field
+
+
+def _related_query(field, ids, child):
+    """Return the through-table query for `_fetch_related` and a function grouping its rows"""
+    through = field.remote_field.through
+    source = f'{field.m2m_field_name()}_id'
+    target = field.m2m_reverse_field_name()
+    links = through.objects.filter(**{f'{source}__in': ids}).order_by(source, f'{target}_id')
+
+    if child is None:
+        def add(grouped, row):
+            grouped[row[0]].append(row[1])
+        return links.values_list(source, f'{target}_id'), add
+
+    prefixed = {f'{target}__{column}': column for column in child.columns}
+
+    def add(grouped, row):
+        grouped[row[source]].append(child.render_row({column: row[key] for key, column in prefixed.items()}))
+    return links.values(source, *prefixed), add
+
+
+def _fetch_related(field, ids, child):
+    """Return `{source_id: [related ids or rendered objects]}` in related id order"""
+    query, add = _related_query(field, ids, child)
+    grouped = defaultdict(list)
+    for row in query:
+        add(grouped, row)
+
+    return grouped
+
+
+async def _afetch_related(field, ids, child):
+    query, add = _related_query(field, ids, child)
+    grouped = defaultdict(list)
+    async for row in query:
+        add(grouped, row)
+
+    return grouped
+
+
+class FastListMixin:
+    """
+    Serve `list` from `values()` rows through a ValuesPlan.
+
+    Falls back to the regular serializer whenever the serializer uses a field
+    the plan cannot reproduce exactly.
+    """
+    fast_list = True
+
+    def get_values_plan(self):
+        if not self.fast_list:
+            return None
+        try:
+            return ValuesPlan(self.get_serializer())
+        except UnsupportedField:
+            return None
+
+    def list(self, request, *args, **kwargs):
+        plan = self.get_values_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        ordering = [field.lstrip('-') for field in getattr(self.paginator, 'ordering', ())]
+        queryset = queryset.values(*dict.fromkeys(plan.columns + ordering))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(plan.render(page))
+
+        return Response(plan.render(list(queryset)))
@@ -0,0 +1,192 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a unique ordering.
+
+    The cursor stores the ordering values of the last row served, and the
+    next page is fetched with a `WHERE (a, b) > (x, y)` style filter, so
+    every page costs the same as the first one and rows inserted between
+    requests never shift or duplicate results.
+    """
+    ordering = ('id',)
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        queryset, position = self.seek(queryset, request)
+
+        return self.set_page(list(queryset), position)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async `paginate_queryset`, reading the page with `aiterator()`"""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        queryset, position = self.seek(queryset, request)
+
+        return self.set_page([row async for row in queryset.aiterator()], position)
+
+    def seek(self, queryset, request):
+        """Return the queryset sliced to the requested page (plus one row) and the cursor position"""
+        self.base_url = request.build_absolute_uri()
+        self.reverse, position = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(_flip(field) for field in ordering)
+
+        if position is not None:
+            try:
+                queryset = queryset.filter(_seek(ordering, position))
+            except (TypeError, ValueError, ValidationError):
+                # Values of the wrong type for their field, e.g. `null` or a string id.
+                raise NotFound(self.invalid_cursor_message)
+
+        return queryset.order_by(*ordering)[:self.page_size + 1], position
+
+    def set_page(self, results, position):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        return self.page
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                page_size = int(request.query_params[self.page_size_query_param])
+            except (KeyError, ValueError):
+                pass
+            else:
+                if page_size > 0:
+                    return min(page_size, self.max_page_size)
+
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+
+        return self.encode_cursor(True, self.page[0])
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def decode_cursor(self, request):
+        """Return `(reverse, position)` for the cursor in the request"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            reverse = bool(payload['r'])
+            position = list(payload['p'])
+        except (binascii.Error, KeyError, TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return reverse, position
+
+    def encode_cursor(self, reverse, obj):
+        """Return a url pointing at the page on either side of `obj`"""
+        # Pages may hold model instances or `values()` dicts.
+        get = obj.get if isinstance(obj, dict) else lambda name: getattr(obj, name)
+        position = [get(field.lstrip('-')) for field in self.ordering]
+        payload = json.dumps({'r': int(reverse), 'p': position}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class NameKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination for tags and ingredients on `name`, descending. Names
+    are unique per user, so no id tiebreaker is needed, and pages are read
+    off the `(user, name)` unique index.
+    """
+    ordering = ('-name',)
+
+
+class SearchKeysetPagination(KeysetPagination):
+    """Keyset pagination for search results, best `search_rank` first"""
+    ordering = ('-search_rank', 'id')
+
+
+def _flip(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def _seek(ordering, position):
+    """
+    Build the lexicographic "strictly after `position`" filter for `ordering`.
+
+    The leading `>=` bound is redundant but lets the planner turn the first
+    column into an index range scan.
+    """
+    lookups = [
+        (field.lstrip('-'), 'lt' if field.startswith('-') else 'gt')
+        for field in ordering
+    ]
+    first_field, first_lookup = lookups[0]
+    condition = Q()
+    for i, (field, lookup) in enumerate(lookups):
+        term = Q(**{f'{field}__{lookup}': position[i]})
+        for j in range(i):
+            term &= Q(**{lookups[j][0]: position[j]})
+        condition |= term
+
+    return Q(**{f'{first_field}__{first_lookup}e': position[0]}) & condition
@@ -0,0 +1,120 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, router, transaction
+from django.utils import timezone
+
+from core.models import Recipe
+from recipe.cache import bump_user_version
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def rendition_path(image_name, rendition, fmt):
+    """Return the storage path of one rendition of an uploaded image"""
+    directory, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+
+    return os.path.join(directory, 'renditions', f'{stem}-{rendition}.{FORMATS[fmt][1]}')
+
+
+def generate_renditions(recipe_id, image_name, using=None):
+    """Write every configured rendition of `image_name` and record their paths"""
+    recipes = Recipe.objects.using(using)
+    storage = Recipe._meta.get_field('image').storage
+    with storage.open(image_name, 'rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+
+    renditions = {}
+    for rendition, options in settings.RECIPE_IMAGE_RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail(options['size'], Image.LANCZOS)
+
+        renditions[rendition] = {}
+        for fmt in options['formats']:
+            pil_format, _, save_options = FORMATS[fmt]
+            converted = image
+            if fmt == 'jpeg' or image.mode not in ('RGB', 'RGBA'):
+                converted = image.convert('RGB')
+            buffer = io.BytesIO()
+            converted.save(buffer, pil_format, **save_options)
+
+            path = rendition_path(image_name, rendition, fmt)
+            storage.delete(path)
+            renditions[rendition][fmt] = storage.save(path, ContentFile(buffer.getvalue()))
+
+    # Only record the renditions if the image was not replaced meanwhile.
+    updated = recipes.filter(pk=recipe_id, image=image_name).update(
+        image_renditions=renditions,
+        updated_at=timezone.now()
+    )
+    if updated:
+        bump_user_version(recipes.values_list('user_id', flat=True).get(pk=recipe_id))
+
+    return renditions
+
+
+def delete_renditions(renditions):
+    storage = Recipe._meta.get_field('image').storage
+    for formats in renditions.values():
+        for path in formats.values():
+            storage.delete(path)
+
+
+def delete_renditions_on_commit(renditions, using):
+    """Delete rendition files once the transaction on `using` commits, so a rollback keeps them"""
+    if renditions:
+        transaction.on_commit(partial(delete_renditions, renditions), using=using)
+
+
+def _run(recipe_id, image_name, using):
+    close_old_connections()
+    try:
+        generate_renditions(recipe_id, image_name, using)
+    except Exception:
+        logger.exception('Failed to generate renditions for recipe %s', recipe_id)
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-renditions'
+            )
+
+    return _executor
+
+
+def schedule_renditions(recipe):
+    """Generate renditions for the recipe's image once the transaction commits"""
+    recipe_id, image_name = recipe.pk, recipe.image.name
+    # Workers run outside the request, so pass on the database, e.g. a shard.
+    using = router.db_for_write(Recipe, instance=recipe)
+
+    def submit():
+        if settings.RECIPE_IMAGE_WORKERS > 0:
+            _get_executor().submit(_run, recipe_id, image_name, using)
+        else:
+            generate_renditions(recipe_id, image_name, using)
+
+    transaction.on_commit(submit, using=using)
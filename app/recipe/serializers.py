@@ -3,7 +3,27 @@ from rest_framework import serializers
 from core.models import Tag, Ingredient, Recipe
 
 
-class TagSerializer(serializers.ModelSerializer):
+class UserOwnedNameSerializer(serializers.ModelSerializer):
+    """Base serializer for objects whose name is unique per user"""
+
+    def validate_name(self, value):
+        request = self.context.get('request')
+        if request is None:
+            return value
+
+        queryset = self.Meta.model.objects.filter(user=request.user, name=value)
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError(self.name_taken_message())
+
+        return value
+
+    def name_taken_message(self):
+        return f'{self.Meta.model.__name__} with this name already exists.'
+
+
+class TagSerializer(UserOwnedNameSerializer):
     """Serializer for tag objects"""
 
     class Meta:
@@ -12,7 +32,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(UserOwnedNameSerializer):
     """Serializer for ingredient objects"""
 
     class Meta:
@@ -21,6 +41,37 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class BulkNameSerializer(serializers.Serializer):
+    """Serializer for a bulk get-or-create request of tags or ingredients"""
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        max_length=1000
+    )
+
+
+class RenditionsField(serializers.Field):
+    """Read-only field mapping stored rendition paths to absolute urls"""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        kwargs.setdefault('source', 'image_renditions')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        storage = Recipe._meta.get_field('image').storage
+        request = self.context.get('request')
+
+        def url(path):
+            url = storage.url(path)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return {
+            rendition: {fmt: url(path) for fmt, path in formats.items()}
+            for rendition, formats in value.items()
+        }
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """Serializer for recipe objects"""
     ingredients = serializers.PrimaryKeyRelatedField(
@@ -31,12 +82,40 @@ class RecipeSerializer(serializers.ModelSerializer):
         many=True,
         queryset=Tag.objects.all()
     )
+    renditions = RenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'title', 'time_minutes', 'price', 'link', 'ingredients', 'tags')
+        fields = ('id', 'title', 'time_minutes', 'price', 'link', 'ingredients', 'tags', 'renditions')
         read_only_fields = ('id',)
 
+    def __init__(self, *args, **kwargs):
+        """Apply the sparse fieldset (`fields`, `expand`) passed in the context"""
+        super().__init__(*args, **kwargs)
+        expand = self.context.get('expand')
+        if expand is not None:
+            for name, nested in (('tags', TagSerializer), ('ingredients', IngredientSerializer)):
+                if name in expand:
+                    self.fields[name] = nested(many=True, read_only=True)
+                else:
+                    self.fields[name] = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class RecipeBatchItemSerializer(RecipeSerializer):
+    """
+    Serializer for one item of a batch create.
+
+    Related ids are only type-checked here; the view resolves them for the
+    whole batch at once instead of running one query per id.
+    """
+    ingredients = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    tags = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
@@ -44,7 +123,9 @@ class RecipeDetailSerializer(RecipeSerializer):
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
+    renditions = RenditionsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'renditions')
         read_only_fields = ('id',)
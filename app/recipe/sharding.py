@@ -0,0 +1,37 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, status
+from rest_framework.permissions import SAFE_METHODS
+
+from core.db import sharding
+
+
+class UserMoving(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Your recipes are being moved, try again shortly.')
+    default_code = 'user_moving'
+
+
+class ShardedViewMixin:
+    """
+    Run the view's queries on the authenticated user's shard, refusing
+    writes while the user moves to another one.
+
+    The shard is read from the primary on every request: `request.user` may
+    come from the token cache, which can lag behind `move_users`.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        shard, moving = sharding.get_user_shard(request.user.pk)
+        if request.method not in SAFE_METHODS and moving:
+            raise UserMoving()
+
+        self._shard_token = sharding.activate(shard)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        token = self.__dict__.pop('_shard_token', None)
+        if token is not None:
+            sharding.deactivate(token)
+
+        return response
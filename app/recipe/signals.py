@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.cache import bump_user_version, start_user_version
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_user_cache(sender, instance, using, **kwargs):
+    """Invalidate the owner's cached list responses on any write"""
+    bump_user_version(instance.user_id, using=using)
+
+
+@receiver(post_save, sender=get_user_model())
+def start_user_cache(sender, instance, created, **kwargs):
+    """Give new users a fresh version right away: they have nothing cached yet"""
+    if created:
+        start_user_version(instance.pk)
@@ -0,0 +1,71 @@
+from django.db.models import Avg, Count, Max, Min, Q
+from rest_framework import serializers
+
+from core.models import Ingredient, Recipe, Tag
+
+# Lower bounds of the `time_minutes` histogram buckets; the last is open ended.
+TIME_BUCKETS = (0, 10, 20, 30, 45, 60, 90, 120)
+TOP_COUNT = 10
+
+_price = serializers.DecimalField(
+    max_digits=None,
+    decimal_places=Recipe._meta.get_field('price').decimal_places
+)
+
+
+def recipe_stats(queryset):
+    """
+    Summarize the recipes of `queryset` in three queries: one aggregate for
+    the counts, prices, times and histogram, and one GROUP BY per relation.
+    """
+    buckets = list(zip(TIME_BUCKETS, TIME_BUCKETS[1:] + (None,)))
+    histogram = {f'bucket_{i}': _bucket(low, high) for i, (low, high) in enumerate(buckets)}
+    totals = queryset.aggregate(
+        count=Count('pk'),
+        price_avg=Avg('price'),
+        price_min=Min('price'),
+        price_max=Max('price'),
+        time_avg=Avg('time_minutes'),
+        time_min=Min('time_minutes'),
+        time_max=Max('time_minutes'),
+        **histogram
+    )
+
+    return {
+        'count': totals['count'],
+        'price': {
+            name: None if totals[f'price_{name}'] is None else _price.to_representation(totals[f'price_{name}'])
+            for name in ('avg', 'min', 'max')
+        },
+        'time_minutes': {
+            'avg': totals['time_avg'],
+            'min': totals['time_min'],
+            'max': totals['time_max'],
+            'histogram': [
+                {'min': low, 'max': high, 'count': totals[f'bucket_{i}']}
+                for i, (low, high) in enumerate(buckets)
+            ],
+        },
+        'top_tags': _top(Tag, queryset),
+        'top_ingredients': _top(Ingredient, queryset),
+    }
+
+
+def _bucket(low, high):
+    condition = Q(time_minutes__gte=low)
+    if high is not None:
+        condition &= Q(time_minutes__lt=high)
+
+    return Count('pk', filter=condition)
+
+
+def _top(model, queryset):
+    """Return the objects used by most recipes of `queryset`, ties by name"""
+    top = (
+        model.objects.filter(recipe__in=queryset.values('pk'))
+        .annotate(recipes=Count('recipe'))
+        .order_by('-recipes', 'name', 'id')
+        .values('id', 'name', 'recipes')
+    )
+
+    return list(top[:TOP_COUNT])
@@ -0,0 +1,119 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from user.authentication import CachedTokenAuthentication
+
+
+def _results(res):
+    return json.loads(res.content)['results']
+
+
+class AsyncReadViewTests(TestCase):
+    """Test the async list and retrieve endpoints against the sync ones"""
+
+    def setUp(self):
+        cache.clear()
+        CachedTokenAuthentication.reset()
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456', name='Sam')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        self.tags = [Tag.objects.create(user=self.user, name=name) for name in ('Vegan', 'Dessert', 'Lunch')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name) for name in ('Rice', 'Salt')]
+        self.recipes = []
+        for i in range(5):
+            recipe = Recipe.objects.create(user=self.user, title=f'Recipe {i}', time_minutes=i, price=f'{i}.25')
+            recipe.tags.add(*self.tags[i % 3:])
+            recipe.ingredients.add(*ingredients[:i % 3])
+            self.recipes.append(recipe)
+
+        other = get_user_model().objects.create_user(email='other@sam.com', password='123456')
+        self.other_recipe = Recipe.objects.create(user=other, title='Not mine', time_minutes=1, price=1)
+
+    def _aget(self, name, params=None, token=True, **kwargs):
+        headers = {'Authorization': f'Token {self.token.key}'} if token else {}
+        return self._request(reverse(f'recipe:{name}', kwargs=kwargs), params, headers)
+
+    @async_to_sync
+    async def _request(self, url, params=None, headers=None):
+        return await self.async_client.get(url, params, headers=headers)
+
+    def test_lists_match_sync_endpoints(self):
+        """Test the async lists return the same results as the sync ones"""
+        cases = [
+            ('recipe', {}),
+            ('recipe', {'tags': f'{self.tags[0].id},{self.tags[1].id}', 'match': 'all'}),
+            ('recipe', {'fields': 'id,title,tags', 'expand': 'tags'}),
+            ('recipe', {'search': 'recipe 3'}),
+            ('tag', {}),
+            ('ingredient', {'assigned_only': 1}),
+        ]
+        for name, params in cases:
+            with self.subTest(name=name, params=params):
+                res = self._aget(f'async-{name}-list', params)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(res['Content-Type'], 'application/json')
+                expected = self.client.get(reverse(f'recipe:{name}-list'), params)
+                self.assertEqual(_results(res), _results(expected))
+
+    def test_list_pagination(self):
+        """Test the async list pages with the same cursors"""
+        res = self._aget('async-recipe-list', {'page_size': 2})
+        ids = [item['id'] for item in _results(res)]
+        next_url = json.loads(res.content)['next']
+        while next_url:
+            res = self._request(next_url, headers={'Authorization': f'Token {self.token.key}'})
+            ids += [item['id'] for item in _results(res)]
+            next_url = json.loads(res.content)['next']
+
+        self.assertEqual(ids, [recipe.id for recipe in self.recipes])
+
+    def test_retrieve_matches_sync_endpoint(self):
+        """Test the async recipe detail renders like the sync one"""
+        recipe = self.recipes[2]
+
+        res = self._aget('async-recipe-detail', pk=recipe.id)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        expected = self.client.get(reverse('recipe:recipe-detail', args=[recipe.id]))
+        self.assertEqual(json.loads(res.content), json.loads(expected.content))
+
+    def test_retrieve_other_users_recipe(self):
+        """Test another user's recipe is not found"""
+        res = self._aget('async-recipe-detail', pk=self.other_recipe.id)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_authentication_required(self):
+        """Test requests without a valid token are rejected"""
+        res = self._aget('async-recipe-list', token=False)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+        res = self._request(reverse('recipe:async-recipe-list'), headers={'Authorization': 'Token invalid'})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_filter(self):
+        """Test validation errors are reported like the sync endpoint"""
+        res = self._aget('async-recipe-list', {'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        expected = self.client.get(reverse('recipe:recipe-list'), {'match': 'some'})
+        self.assertEqual(json.loads(res.content), json.loads(expected.content))
+
+    def test_token_cached(self):
+        """Test the async authentication shares the token cache"""
+        self._aget('async-tag-list')
+        self._aget('async-tag-list')
+
+        self.assertEqual(CachedTokenAuthentication.get_stats(), {'local_hits': 1, 'shared_hits': 0, 'misses': 1})
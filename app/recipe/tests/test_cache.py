@@ -0,0 +1,107 @@
+from unittest.mock import ANY, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe import cache as list_cache
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+
+
+# Query counts of a single-shard deployment, which skips the user's shard lookup.
+@override_settings(USER_SHARDING={'SHARDS': ['default']})
+class ListResponseCacheTests(TestCase):
+    """Test the per-user list response cache"""
+
+    def setUp(self):
+        cache.clear()
+        list_cache.reset_stats()
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456', name='Sam')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(user=self.user, title='Pilaf', time_minutes=30, price=7)
+
+    def test_repeat_list_skips_database(self):
+        """Test that a repeated list is served without queries"""
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(list_cache.get_stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    @override_settings(RECIPE_LIST_CACHE={'TIMEOUT': 300, 'LOCAL_TIMEOUT': 10})
+    def test_process_local_cache_timeout(self):
+        """Test that a process-local cache keeps responses no longer than the local timeout"""
+        with patch.object(caches['default'], 'set', wraps=caches['default'].set) as cache_set:
+            self.client.get(RECIPE_URL)
+
+        cache_set.assert_any_call(ANY, ANY, 10)
+
+    def test_query_params_normalized(self):
+        """Test that parameter order does not split the cache"""
+        self.client.get(RECIPE_URL, {'page_size': 5, 'match': 'any'})
+        self.client.get(f'{RECIPE_URL}?match=any&page_size=5')
+
+        self.assertEqual(list_cache.get_stats()['hits'], 1)
+
+    def test_model_write_invalidates(self):
+        """Test that saving a recipe outside the API invalidates the cache"""
+        self.client.get(RECIPE_URL)
+        self.recipe.title = 'Risotto'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'Risotto')
+
+    def test_invalidated_after_commit(self):
+        """Test that a write only invalidates once its transaction commits"""
+        version = list_cache.get_user_version(self.user.pk)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.recipe.save()
+            self.assertEqual(list_cache.get_user_version(self.user.pk), version)
+        for callback in callbacks:
+            callback()
+
+        self.assertNotEqual(list_cache.get_user_version(self.user.pk), version)
+
+    def test_m2m_change_invalidates(self):
+        """Test that linking a tag invalidates the recipe and tag lists"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPE_URL)
+        self.client.get(TAG_URL, {'assigned_only': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.tags.add(tag)
+
+        self.assertEqual(self.client.get(RECIPE_URL).data['results'][0]['tags'], [tag.id])
+        self.assertEqual(len(self.client.get(TAG_URL, {'assigned_only': 1}).data['results']), 1)
+
+    def test_bulk_endpoint_invalidates(self):
+        """Test that the bulk tag endpoint invalidates the tag list"""
+        self.client.get(TAG_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('recipe:tag-bulk-get-or-create'), {'names': ['Vegan']}, format='json')
+
+        res = self.client.get(TAG_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_is_per_user(self):
+        """Test that users never see each other's cached lists"""
+        self.client.get(RECIPE_URL)
+        other = get_user_model().objects.create_user(email='other@other.com', password='123456')
+        self.client.force_authenticate(user=other)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])
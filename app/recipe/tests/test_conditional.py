@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+# Query counts of a single-shard deployment, which skips the user's shard lookup.
+@override_settings(USER_SHARDING={'SHARDS': ['default']})
+class ConditionalGetTests(TestCase):
+    """Test ETag/Last-Modified revalidation of recipes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456', name='Sam')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(user=self.user, title='Pilaf', time_minutes=30, price=7)
+
+    def test_retrieve_not_modified(self):
+        """Test that a matching ETag returns 304 from one query"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_modified_after_m2m_change(self):
+        """Test that adding a tag changes the recipe's ETag"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        res = self.client.get(detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_retrieve_modified_after_tag_rename(self):
+        """Test that renaming a linked tag changes the recipe's ETag"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe.tags.add(tag)
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        tag.name = 'Vegetarian'
+        tag.save()
+
+        res = self.client.get(detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegetarian')
+
+    def test_list_not_modified(self):
+        """Test that an unchanged list returns 304"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(RECIPE_LIST_CACHE={'TIMEOUT': 0})
+    def test_uncached_list_not_modified_without_query(self):
+        """Test that revalidating a list that is not cached does not query the table"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_modified_after_delete(self):
+        """Test that deleting a recipe changes the list's ETag"""
+        Recipe.objects.create(user=self.user, title='Salad', time_minutes=5, price=3)
+        etag = self.client.get(RECIPE_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_etag_varies_with_query(self):
+        """Test that different filters do not share an ETag"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        res = self.client.get(RECIPE_URL, {'page_size': 1}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_no_last_modified(self):
+        """Test that lists are revalidated by ETag only, as their version is not a date"""
+        res = self.client.get(RECIPE_URL)
+
+        self.assertIn('ETag', res)
+        self.assertNotIn('Last-Modified', res)
+
+    def test_retrieve_if_modified_since(self):
+        """Test revalidating a recipe with the Last-Modified it was served with"""
+        last_modified = self.client.get(detail_url(self.recipe.id))['Last-Modified']
+
+        res = self.client.get(detail_url(self.recipe.id), HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
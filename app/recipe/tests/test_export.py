@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.fast_serializers import FastListMixin
+from recipe.serializers import RecipeSerializer
+from recipe.views import RecipeViewSet
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportApiTests(TestCase):
+    """Test the streaming recipe export"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456', name='Sam')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipes = []
+        for i in range(5):
+            recipe = Recipe.objects.create(user=self.user, title=f'Recipe {i}', time_minutes=i, price=f'{i}.50')
+            if i % 2:
+                recipe.tags.add(self.vegan)
+            recipe.ingredients.add(salt)
+            self.recipes.append(recipe)
+
+        other = get_user_model().objects.create_user(email='other@sam.com', password='123456')
+        Recipe.objects.create(user=other, title='Not mine', time_minutes=1, price='1.00')
+
+    def _content(self, res):
+        return b''.join(res.streaming_content).decode('utf-8')
+
+    def test_export_ndjson(self):
+        """Test the default export is one serialized recipe per line"""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in self._content(res).splitlines()]
+        expected = RecipeSerializer(self.recipes, many=True, context={'request': res.wsgi_request}).data
+        self.assertEqual(lines, json.loads(json.dumps(expected)))
+
+    def test_export_csv(self):
+        """Test the csv export has a header and joins related ids"""
+        res = self.client.get(EXPORT_URL, {'export_format': 'csv'})
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        self.assertIn('recipes.csv', res['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(self._content(res))))
+        self.assertEqual(rows[0], ['id', 'title', 'time_minutes', 'price', 'link', 'ingredients', 'tags'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[2][1:4], ['Recipe 1', '1', '1.50'])
+        self.assertEqual(rows[2][6], str(self.vegan.id))
+        self.assertEqual(rows[1][6], '')
+
+    def test_export_filters(self):
+        """Test the export honours the tag filter"""
+        res = self.client.get(EXPORT_URL, {'tags': self.vegan.id})
+
+        titles = [json.loads(line)['title'] for line in self._content(res).splitlines()]
+        self.assertEqual(titles, ['Recipe 1', 'Recipe 3'])
+
+    def test_export_invalid_format(self):
+        """Test an unknown export format is rejected"""
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_chunked_queries(self):
+        """Test related ids are fetched once per chunk"""
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            res = self.client.get(EXPORT_URL)
+            # One recipe query plus tags and ingredients for each of 3 chunks.
+            with self.assertNumQueries(7):
+                content = self._content(res)
+
+        self.assertEqual(len(content.splitlines()), 5)
+
+    def test_export_without_values_plan(self):
+        """Test the serializer fallback streams the same lines"""
+        fast = self._content(self.client.get(EXPORT_URL))
+        with patch.object(FastListMixin, 'fast_list', False):
+            slow = self._content(self.client.get(EXPORT_URL))
+
+        self.assertEqual(fast, slow)
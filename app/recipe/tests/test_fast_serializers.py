@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.fast_serializers import FastListMixin, ValuesPlan
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+INGREDIENT_URL = reverse('recipe:ingredient-list')
+
+
+class FastListSerializationTests(TestCase):
+    """Test that the values() list path renders exactly like the serializers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456', name='Sam')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        tags = [Tag.objects.create(user=self.user, name=name) for name in ('Vegan', 'Dessert', 'Lunch')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name) for name in ('Rice', 'Salt')]
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=i * 5,
+                price=f'{i}.5',
+                link='https://example.com' if i % 2 else None,
+                image_renditions={'thumbnail': {'webp': f'uploads/recipe/renditions/{i}-thumbnail.webp'}} if i else {},
+            )
+            recipe.tags.add(*tags[i % 3:])
+            recipe.ingredients.add(*ingredients[:i % 3])
+
+    def _get_both(self, url, params):
+        cache.clear()
+        with patch.object(ValuesPlan, 'render', autospec=True, side_effect=ValuesPlan.render) as render:
+            fast = self.client.get(url, params)
+        self.assertTrue(render.called)
+
+        cache.clear()
+        with patch.object(FastListMixin, 'fast_list', False):
+            slow = self.client.get(url, params)
+
+        return fast, slow
+
+    def test_output_identical(self):
+        """Test byte-identical JSON across list variants"""
+        cases = [
+            (RECIPE_URL, {}),
+            (RECIPE_URL, {'page_size': 2}),
+            (RECIPE_URL, {'expand': 'tags,ingredients'}),
+            (RECIPE_URL, {'fields': 'id,price,tags'}),
+            (TAG_URL, {}),
+            (TAG_URL, {'assigned_only': 1, 'page_size': 1}),
+            (INGREDIENT_URL, {'assigned_only': 1}),
+        ]
+        for url, params in cases:
+            with self.subTest(url=url, params=params):
+                fast, slow = self._get_both(url, params)
+
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.content, slow.content)
@@ -8,6 +8,7 @@ from core.models import Ingredient, Recipe
 from recipe.serializers import IngredientSerializer
 
 INGREDIENT_URL = reverse('recipe:ingredient-list')
+INGREDIENT_BULK_URL = reverse('recipe:ingredient-bulk-get-or-create')
 
 
 class PublicIngredientsApiTests(TestCase):
@@ -47,7 +48,7 @@ class PrivateIngredientsApiTests(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEquals(res.status_code, status.HTTP_200_OK)
-        self.assertEquals(res.data, serializer.data)
+        self.assertEquals(res.data['results'], serializer.data)
 
     def test_retrieve_ingredients_limited_to_user(self):
         """Test retrieving Ingredients for authenticated user"""
@@ -62,8 +63,8 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENT_URL)
 
         self.assertEquals(res.status_code, status.HTTP_200_OK)
-        self.assertEquals(len(res.data), 1)
-        self.assertEquals(res.data[0]['name'], ingredient.name)
+        self.assertEquals(len(res.data['results']), 1)
+        self.assertEquals(res.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient_successful(self):
         """Test creating a new Ingredient"""
@@ -83,6 +84,13 @@ class PrivateIngredientsApiTests(TestCase):
 
         self.assertEquals(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_ingredient_duplicate_name(self):
+        """Test that a user cannot create two ingredients with the same name"""
+        Ingredient.objects.create(user=self.user, name='Cucumber')
+        res = self.client.post(INGREDIENT_URL, {'name': 'Cucumber'})
+
+        self.assertEquals(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_retrieve_ingredients_assigned_to_recipes(self):
         """Test filtering Ingredients by those assigned to recipes"""
         ingredient1 = Ingredient.objects.create(user=self.user, name='Powder Rice')
@@ -101,9 +109,9 @@ class PrivateIngredientsApiTests(TestCase):
         serializer2 = IngredientSerializer(ingredient2)
         serializer3 = IngredientSerializer(ingredient3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_retrieve_ingredients_assigned_unique(self):
         """Test filtering Ingredients by assigned returns unique items"""
@@ -117,4 +125,15 @@ class PrivateIngredientsApiTests(TestCase):
 
         res = self.client.get(INGREDIENT_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_bulk_get_or_create_ingredients(self):
+        """Test that bulk create only adds missing ingredients"""
+        existing = Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.post(INGREDIENT_BULK_URL, {'names': ['Salt', 'Pepper']}, format='json')
+
+        self.assertEquals(res.status_code, status.HTTP_200_OK)
+        self.assertEquals(res.data[0], IngredientSerializer(existing).data)
+        self.assertEquals(res.data[1]['name'], 'Pepper')
+        self.assertEquals(Ingredient.objects.filter(user=self.user).count(), 2)
@@ -0,0 +1,110 @@
+import base64
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.pagination import KeysetPagination
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+
+
+def _ids(res):
+    return [item['id'] for item in res.data['results']]
+
+
+class KeysetPaginationTests(TestCase):
+    """Test keyset pagination on the recipe list endpoints"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456', name='Sam')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _create_recipes(self, count):
+        return [
+            Recipe.objects.create(user=self.user, title=f'Recipe {i}', time_minutes=10, price=5)
+            for i in range(count)
+        ]
+
+    def test_recipes_paginated_by_id(self):
+        """Test walking every recipe page with the next cursor"""
+        recipes = self._create_recipes(5)
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(_ids(res), [recipes[0].id, recipes[1].id])
+        self.assertIsNone(res.data['previous'])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(_ids(res), [recipes[2].id, recipes[3].id])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(_ids(res), [recipes[4].id])
+        self.assertIsNone(res.data['next'])
+
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(_ids(res), [recipes[2].id, recipes[3].id])
+
+    def test_pagination_stable_under_inserts(self):
+        """Test that rows created between requests do not shift the next page"""
+        recipes = self._create_recipes(4)
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        next_url = res.data['next']
+        Recipe.objects.filter(id=recipes[0].id).delete()
+        new_recipe = self._create_recipes(1)[0]
+
+        res = self.client.get(next_url)
+        self.assertEqual(_ids(res), [recipes[2].id, recipes[3].id])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(_ids(res), [new_recipe.id])
+
+    def test_tags_paginated_by_name_and_id(self):
+        """Test walking tags one page at a time in descending name order"""
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Dessert', 'Cake', 'Breakfast')
+        ]
+
+        seen = []
+        res = self.client.get(TAG_URL, {'page_size': 1})
+        while True:
+            seen.extend(_ids(res))
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        expected = sorted(tags, key=lambda tag: (tag.name, tag.id), reverse=True)
+        self.assertEqual(seen, [tag.id for tag in expected])
+
+    def test_max_page_size(self):
+        """Test that page_size is capped"""
+        self._create_recipes(3)
+
+        with patch.object(KeysetPagination, 'max_page_size', 2):
+            res = self.client.get(RECIPE_URL, {'page_size': 100000})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_invalid_cursor(self):
+        """Test that a tampered cursor returns 404"""
+        res = self.client.get(RECIPE_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_wrong_value_types(self):
+        """Test that a cursor with values of the wrong type returns 404"""
+        for position in (['abc'], [None], [[1]]):
+            cursor = base64.urlsafe_b64encode(json.dumps({'r': 0, 'p': position}).encode()).decode()
+            res = self.client.get(RECIPE_URL, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND, position)
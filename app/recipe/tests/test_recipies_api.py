@@ -3,13 +3,16 @@ import tempfile
 
 from PIL import Image
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
 from core.test.test_models import sample_user
+from recipe.renditions import delete_renditions
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPE_URL = reverse('recipe:recipe-list')
@@ -76,7 +79,7 @@ class PrivateRecipesApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEquals(res.data, serializer.data)
+        self.assertEquals(res.data['results'], serializer.data)
 
     def rest_retrieve_recipes_limited_to_user(self):
         """Test retrieving recipes for authenticated user"""
@@ -93,8 +96,8 @@ class PrivateRecipesApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEquals(res.status_code, status.HTTP_200_OK)
-        self.assertEquals(len(res.data), 1)
-        self.assertEquals(res.data, serializer.data)
+        self.assertEquals(len(res.data['results']), 1)
+        self.assertEquals(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """Test retrieving recipe details"""
@@ -254,6 +257,8 @@ class RecipeImageUploadTests(TestCase):
         # print(self.recipe)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        delete_renditions(self.recipe.image_renditions)
         self.recipe.image.delete()
 
     def test_image_upload_to_recipe(self):
@@ -271,6 +276,66 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    @override_settings(RECIPE_IMAGE_WORKERS=0)
+    def test_image_upload_generates_renditions(self):
+        """Test that resized copies are generated after the upload commits"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (1200, 900)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        thumbnail = self.recipe.image_renditions['thumbnail']
+
+        self.assertEqual(set(self.recipe.image_renditions), {'thumbnail', 'medium'})
+        self.assertEqual(set(thumbnail), {'webp', 'jpeg'})
+        storage = self.recipe.image.storage
+        with storage.open(thumbnail['webp']) as f:
+            self.assertEqual(Image.open(f).size, (150, 113))
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertTrue(res.data['renditions']['medium']['jpeg'].endswith('-medium.jpg'))
+
+    def _upload_image(self, size):
+        """Upload a new image, returning the on-commit callbacks it registered"""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', size).save(ntf, format='JPEG')
+            ntf.seek(0)
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.post(image_upload_url(self.recipe.id), {'image': ntf}, format='multipart')
+
+        return callbacks
+
+    @override_settings(RECIPE_IMAGE_WORKERS=0)
+    def test_image_replaced_renditions_deleted_on_commit(self):
+        """Test that the old renditions are only deleted once the new image commits"""
+        for callback in self._upload_image((400, 300)):
+            callback()
+        self.recipe.refresh_from_db()
+        old = self.recipe.image_renditions['thumbnail']['webp']
+        storage = self.recipe.image.storage
+
+        callbacks = self._upload_image((300, 400))
+        self.assertTrue(storage.exists(old))
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(storage.exists(old))
+
+    @override_settings(RECIPE_IMAGE_WORKERS=0)
+    def test_image_upload_without_file(self):
+        """Test that a post without a file leaves a recipe without image as it is"""
+        url = image_upload_url(self.recipe.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(url, {}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+        self.assertEqual(self.recipe.image_renditions, {})
+
     def test_image_upload_bad_request(self):
         """Test image upload to recipe"""
         url = image_upload_url(self.recipe.id)
@@ -303,9 +368,9 @@ class RecipeFilteringApiTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_recipe_by_ingredients(self):
         """Test filtering by ingredients"""
@@ -323,6 +388,171 @@ class RecipeFilteringApiTests(TestCase):
 
         res = self.client.get(RECIPE_URL, {'ingredients': f'{ingredient1.id}, {ingredient2.id}'})
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipe_by_tags_returns_each_recipe_once(self):
+        """Test that a recipe matching several tags is listed once"""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Persian')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual([item['id'] for item in res.data['results']], [recipe.id])
+
+    def test_filter_recipe_match_all(self):
+        """Test that match=all only returns recipes with every tag and ingredient"""
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Persian')
+        ingredient = sample_ingredient(user=self.user, name='Rice')
+        recipe1 = sample_recipe(user=self.user, title='Pilaf')
+        recipe1.tags.add(tag1, tag2)
+        recipe1.ingredients.add(ingredient)
+        recipe2 = sample_recipe(user=self.user, title='Salad')
+        recipe2.tags.add(tag1)
+        recipe2.ingredients.add(ingredient)
+        recipe3 = sample_recipe(user=self.user, title='Stew')
+        recipe3.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPE_URL, {
+            'tags': f'{tag1.id},{tag2.id}',
+            'ingredients': f'{ingredient.id}',
+            'match': 'all',
+        })
+
+        self.assertEqual([item['id'] for item in res.data['results']], [recipe1.id])
+
+    def test_filter_recipe_invalid_match(self):
+        """Test that an unknown match mode is rejected"""
+        res = self.client.get(RECIPE_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+# Query counts of a single-shard deployment, which skips the user's shard lookup.
+@override_settings(USER_SHARDING={'SHARDS': ['default']})
+class RecipeQueryCountTests(TestCase):
+    """Test that recipe reads run a fixed number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user()
+        self.client.force_authenticate(user=self.user)
+        self.tag = sample_tag(user=self.user)
+        self.ingredient = sample_ingredient(user=self.user)
+
+    def _create_recipes(self, count):
+        recipes = Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'Recipe {i}', time_minutes=10, price=5)
+            for i in range(count)
+        ])
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=self.tag.id) for recipe in recipes
+        ])
+        Recipe.ingredients.through.objects.bulk_create([
+            Recipe.ingredients.through(recipe_id=recipe.id, ingredient_id=self.ingredient.id) for recipe in recipes
+        ])
+
+        return recipes
+
+    def test_list_query_count(self):
+        """Test listing recipes is one recipe query and one per relation"""
+        for count in (1, 100, 1000):
+            Recipe.objects.all().delete()
+            self._create_recipes(count)
+
+            for params in (
+                {},
+                {'tags': self.tag.id},
+                {'ingredients': self.ingredient.id},
+                {'tags': self.tag.id, 'ingredients': self.ingredient.id, 'match': 'all'},
+            ):
+                with self.subTest(count=count, params=params), self.assertNumQueries(3):
+                    res = self.client.get(RECIPE_URL, {'page_size': count, **params})
+
+                self.assertEqual(len(res.data['results']), count)
+                self.assertEqual(res.data['results'][0]['tags'], [self.tag.id])
+
+    def test_retrieve_query_count(self):
+        """Test retrieving a recipe is a validator query, one recipe query and one per relation"""
+        recipe = self._create_recipes(1)[0]
+
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data['tags'][0]['name'], self.tag.name)
+
+
+class RecipeBatchCreateApiTests(TestCase):
+    """Test creating recipes in batches"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('recipe:recipe-batch-create')
+
+    def test_batch_create(self):
+        """Test that every recipe and its links are created"""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        payload = [
+            {'title': 'Pilaf', 'time_minutes': 30, 'price': '7.50', 'tags': [tag.id], 'ingredients': [ingredient.id]},
+            {'title': 'Salad', 'time_minutes': 5, 'price': '3.00'},
+        ]
+
+        res = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['status'] for item in res.data], [201, 201])
+        recipe = Recipe.objects.get(id=res.data[0]['data']['id'])
+        self.assertEqual(recipe.title, 'Pilaf')
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+        self.assertEqual(res.data[0]['data'], RecipeSerializer(recipe).data)
+
+    def test_batch_create_reports_item_errors(self):
+        """Test that invalid items are reported without blocking valid ones"""
+        other_tag = sample_tag(user=get_user_model().objects.create_user(email='other@other.com', password='123456'))
+        payload = [
+            {'title': 'Pilaf', 'time_minutes': 30, 'price': '7.50'},
+            {'title': 'Salad'},
+            {'title': 'Soup', 'time_minutes': 5, 'price': '3.00', 'tags': [other_tag.id]},
+        ]
+
+        res = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([item['status'] for item in res.data], [201, 400, 400])
+        self.assertIn('time_minutes', res.data[1]['errors'])
+        self.assertIn('tags', res.data[2]['errors'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_batch_create_query_count_independent_of_size(self):
+        """Test that batch size does not change the number of queries"""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+
+        def payload(count):
+            return [
+                {'title': f'Recipe {i}', 'time_minutes': 10, 'price': '5.00',
+                 'tags': [tag.id], 'ingredients': [ingredient.id]}
+                for i in range(count)
+            ]
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, payload(2), format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, payload(50), format='json')
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 52)
+
+    def test_batch_create_requires_list(self):
+        """Test that a non-list payload is rejected"""
+        res = self.client.post(self.url, {'title': 'Pilaf'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,91 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.fast_serializers import FastListMixin
+
+RECIPE_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def _titles(res):
+    return [item['title'] for item in res.data['results']]
+
+
+class RecipeSearchApiTests(TestCase):
+    """Test searching recipes by title"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456', name='Sam')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        for title in ('Spicy chicken curry', 'Chicken curry', 'Lentil soup', 'Curry chicken wings', 'chicken curry'):
+            Recipe.objects.create(user=self.user, title=title, time_minutes=10, price=5)
+
+    def test_search_ranks_matches(self):
+        """Test exact and prefix title matches rank above other matches"""
+        res = self.client.get(RECIPE_URL, {'search': 'chicken curry'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            _titles(res),
+            ['Chicken curry', 'chicken curry', 'Spicy chicken curry', 'Curry chicken wings']
+        )
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are never returned"""
+        other = get_user_model().objects.create_user(email='other@sam.com', password='123456')
+        Recipe.objects.create(user=other, title='Lentil soup', time_minutes=10, price=5)
+
+        res = self.client.get(RECIPE_URL, {'search': 'lentil'})
+
+        self.assertEqual(_titles(res), ['Lentil soup'])
+
+    def test_search_paginates_by_rank(self):
+        """Test walking search results page by page keeps the ranked order"""
+        res = self.client.get(RECIPE_URL, {'search': 'curry', 'page_size': 2})
+        titles = _titles(res)
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            titles += _titles(res)
+
+        self.assertEqual(titles, _titles(self.client.get(RECIPE_URL, {'search': 'curry'})))
+        self.assertEqual(len(titles), 4)
+
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(_titles(res), titles[:2])
+
+    def test_search_with_tag_filter(self):
+        """Test search combines with the tag filter"""
+        spicy = Tag.objects.create(user=self.user, name='Spicy')
+        Recipe.objects.get(title='Curry chicken wings').tags.add(spicy)
+
+        res = self.client.get(RECIPE_URL, {'search': 'chicken', 'tags': spicy.id})
+
+        self.assertEqual(_titles(res), ['Curry chicken wings'])
+
+    def test_search_without_words(self):
+        """Test a term without any word matches nothing and a blank one is ignored"""
+        self.assertEqual(_titles(self.client.get(RECIPE_URL, {'search': '%!'})), [])
+        self.assertEqual(len(_titles(self.client.get(RECIPE_URL, {'search': '  '}))), 5)
+
+    def test_search_fast_list_identical(self):
+        """Test the values() list path renders search results like the serializer"""
+        params = {'search': 'curry', 'page_size': 3}
+        fast = self.client.get(RECIPE_URL, params)
+        with patch.object(FastListMixin, 'fast_list', False):
+            slow = self.client.get(RECIPE_URL, {**params, 'slow': 1})
+
+        self.assertEqual(fast.content, slow.content.replace(b'&slow=1', b''))
+
+    def test_search_export(self):
+        """Test the export streams only matching recipes"""
+        res = self.client.get(EXPORT_URL, {'search': 'soup'})
+
+        self.assertIn(b'Lentil soup', b''.join(res.streaming_content))
@@ -0,0 +1,88 @@
+import io
+import json
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.sharding import get_shards
+from core.models import Recipe, Tag
+from user.authentication import CachedTokenAuthentication
+
+RECIPE_URL = reverse('recipe:recipe-list')
+# Test databases are set up for every class, skipped or not: only ask for
+# the second shard when it is configured.
+SECOND_SHARD = 'shard_1' in get_shards() and 'shard_1' in settings.DATABASES
+SHARD_DATABASES = {'default', 'shard_1'} if SECOND_SHARD else {'default'}
+
+
+@skipUnless(SECOND_SHARD, 'Needs a second shard, see DB_SHARD_HOSTS')
+class ShardedRecipeApiTests(TestCase):
+    """Test the recipe endpoints of a user whose data lives on another shard"""
+    databases = SHARD_DATABASES
+
+    def setUp(self):
+        cache.clear()
+        CachedTokenAuthentication.reset()
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456')
+        call_command('move_users', 'sam@sam.com', to='shard_1', drain_seconds=0, stdout=io.StringIO())
+        self.user.refresh_from_db()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_create_and_list(self):
+        """Test recipes and tags are written to and read from the user's shard"""
+        tag = self.client.post(reverse('recipe:tag-list'), {'name': 'Vegan'})
+        res = self.client.post(RECIPE_URL, {
+            'title': 'Curry', 'time_minutes': 5, 'price': '2.00', 'tags': [tag.data['id']], 'ingredients': []
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Recipe.objects.using('default').exists())
+        recipe = Recipe.objects.using('shard_1').get()
+        self.assertEqual(list(recipe.tags.values_list('name', flat=True)), ['Vegan'])
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual([item['title'] for item in res.data['results']], ['Curry'])
+        res = self.client.get(reverse('recipe:recipe-detail', args=[recipe.pk]))
+        self.assertEqual(res.data['tags'], [{'id': tag.data['id'], 'name': 'Vegan'}])
+
+    def test_export(self):
+        """Test the streamed export reads from the user's shard"""
+        Tag.objects.using('shard_1').create(user=self.user, name='Vegan')
+        Recipe.objects.using('shard_1').create(user=self.user, title='Curry', time_minutes=5, price='2.00')
+
+        res = self.client.get(reverse('recipe:recipe-export'))
+
+        lines = b''.join(res.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['Curry'])
+
+    def test_routed_on_stored_state(self):
+        """Test requests follow the user's stored shard, not a stale authenticated copy"""
+        users = get_user_model().objects.filter(pk=self.user.pk)
+        users.update(shard_moving=True)
+
+        res = self.client.post(reverse('recipe:tag-list'), {'name': 'Vegan'})
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        users.update(shard='default', shard_moving=False)
+        Recipe.objects.using('default').create(user_id=self.user.pk, title='Pilaf', time_minutes=5, price='2.00')
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual([item['title'] for item in res.data['results']], ['Pilaf'])
+
+    def test_writes_refused_while_moving(self):
+        """Test a moving user can read but not write"""
+        self.user.shard_moving = True
+        self.user.save()
+
+        self.assertEqual(self.client.get(RECIPE_URL).status_code, status.HTTP_200_OK)
+        res = self.client.post(reverse('recipe:tag-list'), {'name': 'Vegan'})
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(Tag.objects.using('shard_1').exists())
@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsetTests(TestCase):
+    """Test ?fields= and ?expand= on the recipe endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456', name='Sam')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(user=self.user, name='Rice')
+        self.recipe = Recipe.objects.create(user=self.user, title='Pilaf', time_minutes=30, price=7)
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def test_list_selected_fields(self):
+        """Test that only the requested columns are fetched and rendered"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [{'id': self.recipe.id, 'title': 'Pilaf'}])
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('core_recipe_tags', sql)
+        self.assertNotIn('"core_recipe"."price"', sql)
+
+    def test_list_expand(self):
+        """Test nesting a relation in the list"""
+        res = self.client.get(RECIPE_URL, {'expand': 'tags'})
+
+        recipe = res.data['results'][0]
+        self.assertEqual(recipe['tags'], [{'id': self.tag.id, 'name': 'Vegan'}])
+        self.assertEqual(recipe['ingredients'], [self.ingredient.id])
+
+    def test_detail_without_expand(self):
+        """Test that an empty expand returns ids on the detail endpoint"""
+        res = self.client.get(detail_url(self.recipe.id), {'expand': '', 'fields': 'id,tags'})
+
+        self.assertEqual(res.data, {'id': self.recipe.id, 'tags': [self.tag.id]})
+
+    def test_detail_default_expanded(self):
+        """Test that the detail endpoint still nests relations by default"""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.data['ingredients'], [{'id': self.ingredient.id, 'name': 'Rice'}])
+
+    def test_unknown_field_rejected(self):
+        """Test that unknown field names return 400"""
+        res = self.client.get(RECIPE_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fields_ignored_on_update(self):
+        """Test that writes always use the full serializer"""
+        res = self.client.patch(f'{detail_url(self.recipe.id)}?fields=id', {'title': 'Risotto'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Risotto')
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+STATS_URL = reverse('recipe:recipe-stats')
+
+
+# Query counts of a single-shard deployment, which skips the user's shard lookup.
+@override_settings(USER_SHARDING={'SHARDS': ['default']})
+class RecipeStatsApiTests(TestCase):
+    """Test the recipe statistics endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456', name='Sam')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.dinner = Tag.objects.create(user=self.user, name='Dinner')
+        rice = Ingredient.objects.create(user=self.user, name='Rice')
+        for title, minutes, price, tags in (
+            ('Curry', 25, '6.00', [self.vegan, self.dinner]),
+            ('Salad', 5, '3.00', [self.vegan]),
+            ('Roast', 150, '12.00', [self.dinner]),
+            ('Soup', 25, '4.25', []),
+        ):
+            recipe = Recipe.objects.create(user=self.user, title=title, time_minutes=minutes, price=price)
+            recipe.tags.add(*tags)
+            recipe.ingredients.add(rice)
+
+        other = get_user_model().objects.create_user(email='other@sam.com', password='123456')
+        Recipe.objects.create(user=other, title='Not mine', time_minutes=1, price='99.00')
+
+    def test_stats(self):
+        """Test counts, prices, histogram and top tags in three queries"""
+        with self.assertNumQueries(3):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 4)
+        self.assertEqual(res.data['price'], {'avg': '6.31', 'min': '3.00', 'max': '12.00'})
+        self.assertEqual(res.data['time_minutes']['avg'], 51.25)
+        histogram = {bucket['min']: bucket['count'] for bucket in res.data['time_minutes']['histogram']}
+        self.assertEqual(histogram[0], 1)
+        self.assertEqual(histogram[20], 2)
+        self.assertEqual(histogram[120], 1)
+        self.assertEqual(sum(histogram.values()), 4)
+        self.assertIsNone(res.data['time_minutes']['histogram'][-1]['max'])
+        self.assertEqual(
+            res.data['top_tags'],
+            [
+                {'id': self.dinner.id, 'name': 'Dinner', 'recipes': 2},
+                {'id': self.vegan.id, 'name': 'Vegan', 'recipes': 2},
+            ]
+        )
+        self.assertEqual(res.data['top_ingredients'][0]['recipes'], 4)
+
+    def test_stats_filtered_by_tag(self):
+        """Test statistics honour the tag filter"""
+        res = self.client.get(STATS_URL, {'tags': self.vegan.id})
+
+        self.assertEqual(res.data['count'], 2)
+        self.assertEqual(res.data['price']['max'], '6.00')
+        self.assertEqual([tag['name'] for tag in res.data['top_tags']], ['Vegan', 'Dinner'])
+
+    def test_stats_empty(self):
+        """Test statistics of a user without recipes"""
+        Recipe.objects.filter(user=self.user).delete()
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['count'], 0)
+        self.assertEqual(res.data['price'], {'avg': None, 'min': None, 'max': None})
+        self.assertEqual(res.data['top_tags'], [])
+
+    def test_stats_cached_until_recipes_change(self):
+        """Test repeated requests are cached and a write invalidates them"""
+        self.client.get(STATS_URL)
+        with self.assertNumQueries(0):
+            self.client.get(STATS_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(user=self.user, title='Toast', time_minutes=2, price='1.00')
+
+        self.assertEqual(self.client.get(STATS_URL).data['count'], 5)
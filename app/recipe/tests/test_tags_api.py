@@ -1,5 +1,7 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -8,6 +10,7 @@ from core.models import Tag, Recipe
 from recipe.serializers import TagSerializer
 
 TAG_URL = reverse('recipe:tag-list')
+TAG_BULK_URL = reverse('recipe:tag-bulk-get-or-create')
 
 
 class PublicTagsApiTests(TestCase):
@@ -45,8 +48,8 @@ class PrivateTagsApiTests(TestCase):
         # print(str(len(serializer.data)))
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEquals(res.data, serializer.data)
-        self.assertEqual(len(res.data), 2)
+        self.assertEquals(res.data['results'], serializer.data)
+        self.assertEqual(len(res.data['results']), 2)
 
     def test_tag_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
@@ -57,8 +60,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAG_URL)
 
         self.assertEquals(res.status_code, status.HTTP_200_OK)
-        self.assertEquals(len(res.data), 1)
-        self.assertEquals(res.data[0]['name'], tag.name)
+        self.assertEquals(len(res.data['results']), 1)
+        self.assertEquals(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """Test creating a new tag"""
@@ -78,6 +81,38 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.post(TAG_URL, payload)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_tag_duplicate_name(self):
+        """Test that a user cannot create two tags with the same name"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.post(TAG_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(user=self.user, name='Vegan').count(), 1)
+
+    def test_create_tag_duplicate_name_race(self):
+        """Test that a tag created between validation and save returns 400"""
+        validate_name = TagSerializer.validate_name
+
+        def validate_then_create(serializer, value):
+            value = validate_name(serializer, value)
+            Tag.objects.create(user=self.user, name=value)
+            return value
+
+        with patch.object(TagSerializer, 'validate_name', validate_then_create):
+            res = self.client.post(TAG_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data, {'name': ['Tag with this name already exists.']})
+        self.assertEqual(Tag.objects.filter(user=self.user, name='Vegan').count(), 1)
+
+    def test_create_tag_name_used_by_other_user(self):
+        """Test that tag names only need to be unique per user"""
+        user2 = get_user_model().objects.create(email='other@other.com', password='password', name='Other')
+        Tag.objects.create(user=user2, name='Vegan')
+        res = self.client.post(TAG_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
     def test_retrieve_tags_assigned_to_recipes(self):
         """Test filtering tags by those assigned to recipes"""
         tag1 = Tag.objects.create(user=self.user, name='Breakfast')
@@ -96,9 +131,9 @@ class PrivateTagsApiTests(TestCase):
         serializer2 = TagSerializer(tag2)
         serializer3 = TagSerializer(tag3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique items"""
@@ -112,4 +147,25 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAG_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    @override_settings(USER_SHARDING={'SHARDS': ['default']})
+    def test_bulk_get_or_create_tags(self):
+        """Test that bulk create returns existing and new tags in input order"""
+        existing = Tag.objects.create(user=self.user, name='Vegan')
+        payload = {'names': ['Dessert', 'Vegan', 'Breakfast', 'Dessert']}
+
+        with self.assertNumQueries(2):
+            res = self.client.post(TAG_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['name'] for tag in res.data], payload['names'])
+        self.assertEqual(res.data[1]['id'], existing.id)
+        self.assertEqual(res.data[0]['id'], res.data[3]['id'])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_get_or_create_tags_invalid(self):
+        """Test that an empty list of names is rejected"""
+        res = self.client.post(TAG_BULK_URL, {'names': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
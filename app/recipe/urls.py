@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import async_views, views
 
 router = DefaultRouter()
 router.register('tags', views.TagViewSet)
@@ -12,4 +12,10 @@ app_name = 'recipe'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('async/recipes/', async_views.AsyncRecipeView.as_view(), name='async-recipe-list'),
+    path('async/recipes/<int:pk>/', async_views.AsyncRecipeView.as_view(), name='async-recipe-detail'),
+    path('async/tags/', async_views.AsyncTagView.as_view(), name='async-tag-list'),
+    path('async/tags/<int:pk>/', async_views.AsyncTagView.as_view(), name='async-tag-detail'),
+    path('async/ingredients/', async_views.AsyncIngredientView.as_view(), name='async-ingredient-list'),
+    path('async/ingredients/<int:pk>/', async_views.AsyncIngredientView.as_view(), name='async-ingredient-detail'),
 ]
@@ -1,21 +1,42 @@
+from django.db import IntegrityError, router, transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from rest_framework.response import Response
 
+from core.db.sharding import get_current_shard, iterate_on_shard
 from core.models import Tag, Ingredient, Recipe
+from recipe.cache import CachedListMixin, bump_user_version, get_or_compute
+from recipe.conditional import ConditionalGetMixin
+from recipe.export import EXPORT_FORMATS, render_rows, stream_csv, stream_ndjson
+from recipe.fast_serializers import FastListMixin
+from recipe.pagination import KeysetPagination, NameKeysetPagination, SearchKeysetPagination
+from recipe.renditions import delete_renditions_on_commit, schedule_renditions
 from recipe.serializers import TagSerializer, IngredientSerializer, RecipeSerializer, RecipeDetailSerializer, \
-    RecipeImageSerializer
+    RecipeImageSerializer, RecipeBatchItemSerializer, BulkNameSerializer
+from recipe.sharding import ShardedViewMixin
+from recipe.stats import recipe_stats
+from user.authentication import CachedTokenAuthentication
+
+
+# Relations that can be expanded, and model columns behind serializer fields.
+RECIPE_RELATIONS = {'tags': Tag, 'ingredients': Ingredient}
+RECIPE_FIELD_COLUMNS = {'renditions': 'image_renditions'}
+RECIPE_CSV_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link', 'ingredients', 'tags')
 
 
 def _params_to_ints(qs):
     return [int(str_id) for str_id in qs.split(',')]
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin, mixins.ListModelMixin):
-    authentication_classes = (TokenAuthentication,)
+class BaseRecipeAttrViewSet(ShardedViewMixin, CachedListMixin, FastListMixin, viewsets.GenericViewSet,
+                            mixins.CreateModelMixin, mixins.ListModelMixin):
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = NameKeysetPagination
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
@@ -23,13 +44,36 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin, mi
         queryset = self.queryset
 
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.assigned()
 
-        return queryset.filter(user=self.request.user).order_by('-name').distinct()
+        return queryset.filter(user=self.request.user).order_by('-name')
 
     def perform_create(self, serializer):
         """Create a new object"""
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic(using=router.db_for_write(self.queryset.model)):
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            # A concurrent request created the same name after validation.
+            raise ValidationError({'name': [serializer.name_taken_message()]})
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk_get_or_create(self, request):
+        """Return objects for a list of names, creating the missing ones"""
+        serializer = BulkNameSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        names = list(dict.fromkeys(serializer.validated_data['names']))
+        model = self.queryset.model
+
+        model.objects.bulk_create(
+            [model(user=request.user, name=name) for name in names],
+            ignore_conflicts=True
+        )
+        bump_user_version(request.user.pk)
+        objects = {obj.name: obj for obj in model.objects.filter(user=request.user, name__in=names)}
+        ordered = [objects[name] for name in serializer.validated_data['names']]
+
+        return Response(self.get_serializer(ordered, many=True).data, status=status.HTTP_200_OK)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -44,27 +88,100 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ShardedViewMixin, CachedListMixin, ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
     """Manage recipes in the database."""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
+    pagination_class = KeysetPagination
+    batch_max_size = 1000
+    export_chunk_size = 2000
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
         tags = self.request.query_params.get('tags', None)
         ingredients = self.request.query_params.get('ingredients', None)
+        match = self.request.query_params.get('match', 'any')
         queryset = self.queryset
 
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': "Must be 'any' or 'all'."})
+        match_all = match == 'all'
+
         if tags:
             tag_ids = _params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = queryset.with_related('tags', tag_ids, match_all)
         if ingredients:
             ingredient_ids = _params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = queryset.with_related('ingredients', ingredient_ids, match_all)
+
+        queryset = queryset.filter(user=self.request.user)
+        search = self.get_search_term()
+        if search is not None:
+            queryset = queryset.search(search)
+
+        fields, expand = self.get_sparse_fieldset()
+        if fields is not None:
+            columns = [RECIPE_FIELD_COLUMNS.get(field, field) for field in fields if field not in RECIPE_RELATIONS]
+            queryset = queryset.only('id', *columns)
+
+        for relation, model in RECIPE_RELATIONS.items():
+            if fields is not None and relation not in fields:
+                continue
+            if expand is None:
+                expanded = self.action == 'retrieve'
+            else:
+                expanded = relation in expand
+            # Unexpanded relations only render ids, so only fetch ids. Related
+            # objects are ordered by id, matching the fast list path.
+            related = model.objects.order_by('id')
+            if not expanded:
+                related = related.only('id')
+            queryset = queryset.prefetch_related(Prefetch(relation, queryset=related))
+
+        return queryset
+
+    def get_search_term(self):
+        if self.action not in ('list', 'export'):
+            return None
+
+        return self.request.query_params.get('search', '').strip() or None
+
+    @property
+    def paginator(self):
+        """Page search results by rank instead of id"""
+        if not hasattr(self, '_paginator') and self.get_search_term() is not None:
+            self._paginator = SearchKeysetPagination()
+
+        return super().paginator
+
+    def get_sparse_fieldset(self):
+        """Return the `(fields, expand)` requested for list/retrieve, None meaning the default"""
+        if self.action not in ('list', 'retrieve') or self.request.method not in SAFE_METHODS:
+            return None, None
+
+        params = self.request.query_params
+        selected = {}
+        for param, allowed in (('fields', RecipeSerializer.Meta.fields), ('expand', tuple(RECIPE_RELATIONS))):
+            if param not in params:
+                selected[param] = None
+                continue
+
+            names = [name.strip() for name in params[param].split(',') if name.strip()]
+            invalid = [name for name in names if name not in allowed]
+            if invalid:
+                raise ValidationError({param: f'Unknown field(s): {", ".join(invalid)}.'})
+            selected[param] = tuple(names)
 
-        return queryset.filter(user=self.request.user)
+        return selected['fields'], selected['expand']
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields, expand = self.get_sparse_fieldset()
+        context.update(fields=fields, expand=expand)
+
+        return context
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -78,6 +195,106 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(methods=['POST'], detail=False, url_path='batch')
+    def batch_create(self, request):
+        """Create a list of recipes with one bulk insert per table"""
+        if not isinstance(request.data, list):
+            return Response({'detail': 'Expected a list of recipes.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > self.batch_max_size:
+            return Response(
+                {'detail': f'A batch may contain at most {self.batch_max_size} recipes.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        context = self.get_serializer_context()
+        items = [RecipeBatchItemSerializer(data=item, context=context) for item in request.data]
+        errors = [None if item.is_valid() else item.errors for item in items]
+
+        for relation, model in (('tags', Tag), ('ingredients', Ingredient)):
+            requested = {pk for item, error in zip(items, errors) if error is None for pk in item.validated_data[relation]}
+            owned = set(model.objects.filter(user=request.user, id__in=requested).values_list('id', flat=True))
+            for i, item in enumerate(items):
+                missing = [pk for pk in item.validated_data.get(relation, []) if pk not in owned]
+                if errors[i] is None and missing:
+                    errors[i] = {relation: [f'Invalid pk "{pk}" - object does not exist.' for pk in missing]}
+
+        valid = [item.validated_data for item, error in zip(items, errors) if error is None]
+        # The user's shard, where the inserts below go.
+        using = router.db_for_write(Recipe)
+        with transaction.atomic(using=using):
+            recipes = Recipe.objects.bulk_create([
+                Recipe(user=request.user, **{
+                    field: value for field, value in data.items() if field not in ('tags', 'ingredients')
+                })
+                for data in valid
+            ])
+            for relation, column in (('tags', 'tag_id'), ('ingredients', 'ingredient_id')):
+                through = getattr(Recipe, relation).through
+                through.objects.bulk_create([
+                    through(recipe_id=recipe.id, **{column: pk})
+                    for recipe, data in zip(recipes, valid)
+                    for pk in dict.fromkeys(data[relation])
+                ])
+            # bulk_create sends no signals, so invalidate cached lists here.
+            bump_user_version(request.user.pk, using=using)
+
+        prefetch_related_objects(recipes, 'tags', 'ingredients')
+        created = iter(RecipeSerializer(recipes, many=True).data)
+        results = [
+            {'status': status.HTTP_201_CREATED, 'data': next(created)} if error is None
+            else {'status': status.HTTP_400_BAD_REQUEST, 'errors': error}
+            for error in errors
+        ]
+
+        if not recipes and results:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(recipes) < len(results):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+
+        return Response(results, status=response_status)
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """Stream every matching recipe as NDJSON or CSV"""
+        # `format` is taken by DRF's renderer override, hence `export_format`.
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'export_format': f'Must be one of: {", ".join(EXPORT_FORMATS)}.'})
+
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        plan = self.get_values_plan()
+        if plan is not None:
+            rows = queryset.prefetch_related(None).values(*plan.columns).iterator(chunk_size=self.export_chunk_size)
+            items = render_rows(plan, rows, self.export_chunk_size)
+        else:
+            # Django prefetches related objects once per chunk here.
+            serializer = self.get_serializer()
+            items = (
+                serializer.to_representation(recipe)
+                for recipe in queryset.iterator(chunk_size=self.export_chunk_size)
+            )
+
+        if export_format == 'csv':
+            content = stream_csv(items, RECIPE_CSV_FIELDS)
+        else:
+            content = stream_ndjson(items)
+        # The body is read after the view returned and left the user's shard.
+        content = iterate_on_shard(get_current_shard(), content)
+
+        response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="recipes.{export_format}"'
+
+        return response
+
+    @action(methods=['GET'], detail=False, url_path='stats')
+    def stats(self, request):
+        """Return aggregate statistics over the matching recipes"""
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+
+        return Response(get_or_compute(request, 'stats', lambda: recipe_stats(queryset)))
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to recipe"""
@@ -85,7 +302,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            # `image` is optional: without one the current renditions stay.
+            if 'image' not in serializer.validated_data:
+                serializer.save()
+                return Response(serializer.data, status=status.HTTP_200_OK)
+
+            old_renditions = recipe.image_renditions
+            serializer.save(image_renditions={})
+            delete_renditions_on_commit(old_renditions, using=router.db_for_write(Recipe, instance=recipe))
+            if recipe.image:
+                schedule_renditions(recipe)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
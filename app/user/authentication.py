@@ -0,0 +1,217 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+from core.cache import is_shared
+
+DEFAULTS = {
+    # In-process LRU. Kept short-lived because signals only clear the local
+    # copy in the process that made the change.
+    'LOCAL_MAXSIZE': 1024,
+    'LOCAL_TTL': 10,
+    # Django cache, invalidated write-through. Only shared between processes
+    # with a backend such as Redis: a process-local one (LocMemCache) keeps
+    # entries no longer than LOCAL_TTL.
+    'CACHE_ALIAS': 'default',
+    'CACHE_TTL': 300,
+}
+
+
+def _setting(name):
+    return getattr(settings, 'TOKEN_AUTH_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def _cache_ttl():
+    if is_shared(_setting('CACHE_ALIAS')):
+        return _setting('CACHE_TTL')
+
+    return min(_setting('CACHE_TTL'), _setting('LOCAL_TTL'))
+
+
+class _LRUCache:
+    """Thread-safe bounded LRU with a per-entry time to live"""
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        maxsize = _setting('LOCAL_MAXSIZE')
+        with self._lock:
+            self._data[key] = (time.monotonic() + _setting('LOCAL_TTL'), value)
+            self._data.move_to_end(key)
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local_cache = _LRUCache()
+_stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _cache_key(key):
+    # Never put raw tokens into a shared cache backend.
+    return 'auth-token:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def invalidate_token(key):
+    """Drop a token from both the local and the shared cache"""
+    cache_key = _cache_key(key)
+    _local_cache.delete(cache_key)
+    caches[_setting('CACHE_ALIAS')].delete(cache_key)
+
+
+def _projection(obj, exclude=()):
+    """Return a copy of `obj` without cached relations, with the `exclude` fields deferred"""
+    names = [field.attname for field in obj._meta.concrete_fields if field.attname not in exclude]
+
+    return type(obj).from_db(obj._state.db, names, [getattr(obj, name) for name in names])
+
+
+def _shared_entry(user, token):
+    # Keep password hashes out of the shared backend; the hash loads on access.
+    return _projection(user, exclude=('password',)), _projection(token)
+
+
+def _checked(cached):
+    user, token = cached
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+    # Hand out copies so views mutating request.user never touch the cache.
+    return copy.copy(user), copy.copy(token)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for `TokenAuthentication` that caches the token and
+    its user, first in a bounded in-process LRU and then in the Django cache,
+    so most requests skip the token/user SELECT. The Django cache gets the
+    user without its password hash.
+    """
+
+    def authenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+
+        return self.authenticate_credentials(key)
+
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+
+        cached = _local_cache.get(cache_key)
+        if cached is not None:
+            _count('local_hits')
+        else:
+            cached = caches[_setting('CACHE_ALIAS')].get(cache_key)
+            if cached is not None:
+                _count('shared_hits')
+            else:
+                _count('misses')
+                user, token = super().authenticate_credentials(key)
+                cached = (user, token)
+                caches[_setting('CACHE_ALIAS')].set(cache_key, _shared_entry(user, token), _cache_ttl())
+            _local_cache.set(cache_key, cached)
+
+        return _checked(cached)
+
+    def get_key(self, request):
+        """Return the token key of the Authorization header, or None without one"""
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        elif len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. Token string should not contain invalid characters.')
+            )
+
+    async def aauthenticate(self, request):
+        """Async `authenticate` for native async views, taking a Django request"""
+        key = self.get_key(request)
+        if key is None:
+            return None
+
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+        shared = caches[_setting('CACHE_ALIAS')]
+
+        cached = _local_cache.get(cache_key)
+        if cached is not None:
+            _count('local_hits')
+        else:
+            cached = await shared.aget(cache_key)
+            if cached is not None:
+                _count('shared_hits')
+            else:
+                _count('misses')
+                model = self.get_model()
+                try:
+                    token = await model.objects.select_related('user').aget(key=key)
+                except model.DoesNotExist:
+                    raise exceptions.AuthenticationFailed(_('Invalid token.'))
+                cached = (token.user, token)
+                await shared.aset(cache_key, _shared_entry(token.user, token), _cache_ttl())
+            _local_cache.set(cache_key, cached)
+
+        return _checked(cached)
+
+    @staticmethod
+    def get_stats():
+        """Return hit/miss counters for this process"""
+        with _stats_lock:
+            return dict(_stats)
+
+    @staticmethod
+    def reset():
+        """Clear the local cache and counters"""
+        _local_cache.clear()
+        with _stats_lock:
+            for name in _stats:
+                _stats[name] = 0
@@ -0,0 +1,98 @@
+import pickle
+from unittest.mock import ANY, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import CachedTokenAuthentication, _cache_key
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the cached token authentication backend"""
+
+    def setUp(self):
+        cache.clear()
+        CachedTokenAuthentication.reset()
+        self.user = get_user_model().objects.create_user(email='sam@sam.com', password='123456', name='Sam')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_requests_skip_database(self):
+        """Test that only the first request looks the token up"""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(CachedTokenAuthentication.get_stats(), {'local_hits': 1, 'shared_hits': 0, 'misses': 1})
+
+    def test_shared_cache_used_after_local_eviction(self):
+        """Test that a cold process falls back to the Django cache"""
+        self.client.get(ME_URL)
+        CachedTokenAuthentication.reset()
+
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+
+        self.assertEqual(CachedTokenAuthentication.get_stats()['shared_hits'], 1)
+
+    def test_shared_cache_leaves_out_password(self):
+        """Test the shared cache never holds the password hash, loaded only when needed"""
+        self.client.get(ME_URL)
+        user, token = cache.get(_cache_key(self.token.key))
+
+        self.assertNotIn(self.user.password.encode(), pickle.dumps((user, token)))
+        self.assertEqual(user.get_deferred_fields(), {'password'})
+
+        CachedTokenAuthentication.reset()
+        self.client.patch(ME_URL, {'name': 'New Name', 'password': 'newpass123'})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'New Name')
+        self.assertTrue(self.user.check_password('newpass123'))
+
+    @override_settings(TOKEN_AUTH_CACHE={'LOCAL_TTL': 10, 'CACHE_TTL': 300})
+    def test_process_local_cache_ttl(self):
+        """Test that a process-local cache keeps entries no longer than the local TTL"""
+        with patch.object(caches['default'], 'set', wraps=caches['default'].set) as cache_set:
+            self.client.get(ME_URL)
+
+        cache_set.assert_called_once_with(ANY, ANY, 10)
+
+    def test_deleted_token_rejected(self):
+        """Test that deleting a token invalidates the cached entry"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test that deactivating a user invalidates the cached entry"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_refreshes_cached_user(self):
+        """Test that changes through the me endpoint are seen by the next request"""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New Name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')